@@ -0,0 +1,46 @@
+"""Funciones reutilizables para el análisis del test A/B del proyecto 8.
+
+Las funciones principales se pueden importar desde `abtest` directamente;
+cada submódulo se importa recién al usarlo (`import abtest` no carga pandas,
+scipy ni matplotlib):
+
+    import abtest
+    abtest.Prioritizer(abtest.load_hypotheses()).top_k(3, by='RICE')
+
+La línea de comandos está en `python -m abtest` (ver `abtest.cli`).
+"""
+
+import importlib
+
+
+_EXPORTS = {
+    'load_cleaned': 'abtest.cache',
+    'load_hypotheses': 'abtest.cache',
+    'Prioritizer': 'abtest.prioritization',
+    'cumulative_metrics': 'abtest.cumulative',
+    'UserOrders': 'abtest.users',
+    'AnomalyFilter': 'abtest.anomalies',
+    'VariantAnalysis': 'abtest.variants',
+    'mannwhitneyu_hist': 'abtest.significance',
+    'sequential_test': 'abtest.sequential',
+    'cuped_compare': 'abtest.cuped',
+    'segment_cube': 'abtest.segments',
+    'segment_tests': 'abtest.segments',
+    'load_pre_period': 'abtest.cuped',
+    'compute': 'abtest.report',
+    'build_report': 'abtest.report',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
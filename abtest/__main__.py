@@ -0,0 +1,6 @@
+import sys
+
+from abtest.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,87 @@
+"""Filtro de usuarios anómalos con máscaras reutilizables."""
+
+import numpy as np
+import pandas as pd
+
+
+class Rule:
+    """Marca como anómalos a los usuarios cuyo valor en `column` supera `threshold`."""
+
+    def __init__(self, name, column, threshold):
+        self.name = name
+        self.column = column
+        self.threshold = threshold
+
+    def __call__(self, users):
+        return users[self.column].to_numpy() > self.threshold
+
+    def __repr__(self):
+        return f'Rule({self.name!r}, {self.column!r}, {self.threshold!r})'
+
+
+def order_count_cap(limit):
+    """Usuarios con más de `limit` pedidos."""
+    return Rule('order_count_cap', 'orders', limit)
+
+
+def revenue_cap(limit):
+    """Usuarios con algún pedido de más de `limit`."""
+    return Rule('revenue_cap', 'max_revenue', limit)
+
+
+def order_count_percentile(p, sketch):
+    """Usuarios con más pedidos que el percentil `p` del sketch de pedidos por usuario."""
+    return Rule(f'order_count_p{p}', 'orders', float(sketch.percentile(p)))
+
+
+def revenue_percentile(p, sketch):
+    """Usuarios con algún pedido de más que el percentil `p` del sketch de ingresos por pedido."""
+    return Rule(f'revenue_p{p}', 'max_revenue', float(sketch.percentile(p)))
+
+
+class AnomalyFilter:
+    """Marca a los usuarios anómalos a partir de la tabla `users.UserOrders`.
+
+    `rules` es una lista de callables que reciben la tabla por usuario (columnas
+    `orders` y `max_revenue`) y devuelven un arreglo booleano; un usuario es
+    anómalo si cumple alguna regla. Las máscaras se calculan una vez y se
+    guardan para las pruebas filtradas.
+    """
+
+    def __init__(self, user_orders, rules):
+        self.user_orders = user_orders
+        self.users = user_orders.table
+        self.rules = list(rules)
+        self._user_mask = None
+        self._order_mask = None
+
+    @property
+    def user_mask(self):
+        """Máscara booleana alineada con la tabla por usuario."""
+        if self._user_mask is None:
+            mask = np.zeros(len(self.users), dtype=bool)
+            for rule in self.rules:
+                mask |= np.asarray(rule(self.users), dtype=bool)
+            self._user_mask = mask
+        return self._user_mask
+
+    @property
+    def order_mask(self):
+        """Máscara booleana alineada con `orders_us`: pedidos de usuarios anómalos."""
+        if self._order_mask is None:
+            self._order_mask = self.user_orders.order_mask(self.user_mask).rename('abnormal')
+        return self._order_mask
+
+    @property
+    def abnormal_users(self):
+        """Ids de los usuarios anómalos, ordenados."""
+        return pd.Series(pd.unique(self.users['visitor_id'].to_numpy()[self.user_mask]), name='visitor_id')
+
+    def mask_for(self, user_ids):
+        """Máscara alineada con cualquier tabla por usuario (por ejemplo `ordersByUsersA['user_id']`)."""
+        user_ids = np.asarray(user_ids)
+        abnormal = self.abnormal_users.to_numpy()
+        if not abnormal.size:
+            return np.zeros(user_ids.shape[0], dtype=bool)
+        positions = np.searchsorted(abnormal, user_ids).clip(max=abnormal.size - 1)
+        return abnormal[positions] == user_ids
@@ -0,0 +1,66 @@
+"""Intervalos de confianza bootstrap para la diferencia relativa entre grupos."""
+
+from collections import namedtuple
+
+import numpy as np
+
+from abtest.parallel import run_tasks, seeded_chunks
+
+
+LiftInterval = namedtuple('LiftInterval', ('lift', 'low', 'high'))
+
+
+def _bootstrap_means(values, counts, n_boot, seed):
+    """Medias de `n_boot` remuestreos de una muestra dada como histograma.
+
+    Usa el bootstrap de Poisson: cada elemento entra en el remuestreo una
+    cantidad Poisson(1) de veces, así que cada valor distinto recibe un peso
+    Poisson(conteo). Es independiente por valor y evita la multinomial, cuyo
+    costo crece con el tamaño de la muestra. Un remuestreo con todos los pesos
+    en 0 (probabilidad `exp(-n)`, frecuente sólo en muestras chicas) no tiene
+    media, así que se vuelve a sortear.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.poisson(counts, size=(n_boot, counts.size))
+    empty = np.flatnonzero(weights.sum(axis=1) == 0)
+    while empty.size:
+        weights[empty] = rng.poisson(counts, size=(empty.size, counts.size))
+        empty = empty[weights[empty].sum(axis=1) == 0]
+    return weights @ values / weights.sum(axis=1)
+
+
+def _bootstrap_lifts(sample_a, sample_b, n_boot, seed):
+    seed_a, seed_b = seed.spawn(2)
+    return _bootstrap_means(*sample_b, n_boot, seed_b) / _bootstrap_means(*sample_a, n_boot, seed_a) - 1
+
+
+def _as_histogram(sample):
+    if isinstance(sample, tuple):
+        values, counts = sample
+        return np.asarray(values, dtype=np.float64), np.asarray(counts, dtype=np.int64)
+    values, counts = np.unique(np.asarray(sample), return_counts=True)
+    return values.astype(np.float64), counts
+
+
+def lift_interval(sample_a, sample_b, n_boot=10_000, confidence=0.95, seed=None, max_cells=1 << 22,
+                  workers=None):
+    """Intervalo bootstrap de percentiles para `mean(B) / mean(A) - 1`.
+
+    Cada muestra puede ser un arreglo (por ejemplo los ingresos por pedido)
+    o un histograma `(valores, conteos)` como los de
+    `VariantAnalysis.conversion_sample`, que ya incluye las visitas sin
+    pedido como conteo del 0. Los remuestreos se calculan en bloques de a
+    lo sumo `max_cells` pesos, así la memoria no depende de `n_boot` ni del
+    número de valores distintos; con `workers` distinto de 1 los bloques se
+    reparten en un pool de procesos.
+    """
+    sample_a, sample_b = _as_histogram(sample_a), _as_histogram(sample_b)
+    lift = (np.dot(*sample_b) / sample_b[1].sum()) / (np.dot(*sample_a) / sample_a[1].sum()) - 1
+
+    chunk = max(1, max_cells // max(sample_a[0].size, sample_b[0].size, 1))
+    tasks = [(sample_a, sample_b, size, chunk_seed) for size, chunk_seed in seeded_chunks(n_boot, chunk, seed)]
+    lifts = run_tasks(_bootstrap_lifts, tasks, workers)
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(np.concatenate(lifts), [alpha, 1 - alpha])
+    return LiftInterval(float(lift), float(low), float(high))
@@ -0,0 +1,122 @@
+"""Caché columnar (Feather/Arrow) de los datasets limpios.
+
+La primera ejecución lee los CSV, los limpia y guarda el resultado en
+`files/datasets/cache/` junto con el hash SHA-256 de cada archivo de origen.
+Las siguientes ejecuciones abren la caché con memory-map y sólo la reconstruyen
+si cambia algún CSV. Si `pyarrow` no está instalado se leen los CSV cada vez.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+from abtest.contamination import contamination
+
+
+CACHE_VERSION = 1
+SOURCES = {
+    'hypotheses_us': 'hypotheses_us.csv',
+    'orders_us': 'orders_us.csv',
+    'visits_us': 'visits_us.csv',
+}
+
+CleanedData = namedtuple('CleanedData', ('hypotheses_us', 'orders_us', 'visits_us', 'common_visitors'))
+
+
+def file_hash(path, block_size=1 << 20):
+    """Hash SHA-256 del contenido de un archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_sources(datasets_dir='files/datasets'):
+    """Lee los CSV originales con los tipos de datos correctos."""
+    hypotheses_us = pd.read_csv(os.path.join(datasets_dir, SOURCES['hypotheses_us']), sep=';')
+    orders_us = pd.read_csv(os.path.join(datasets_dir, SOURCES['orders_us']), parse_dates=['date'])
+    visits_us = pd.read_csv(os.path.join(datasets_dir, SOURCES['visits_us']), parse_dates=['date'])
+    return hypotheses_us, orders_us, visits_us
+
+
+def load_hypotheses(datasets_dir='files/datasets'):
+    """Lee y limpia sólo `hypotheses_us`, sin tocar pedidos ni visitas (para priorizar)."""
+    hypotheses_us = pd.read_csv(os.path.join(datasets_dir, SOURCES['hypotheses_us']), sep=';')
+    return hypotheses_us.rename(columns=str.lower)
+
+
+def clean_datasets(hypotheses_us, orders_us, visits_us):
+    """Aplica la limpieza del notebook.
+
+    Pasa a minúsculas las columnas de `hypotheses_us`, renombra
+    `transactionId`/`visitorId` y quita de `orders_us` a los usuarios
+    presentes en más de un grupo. `group` queda como categórica.
+    """
+    hypotheses_us = hypotheses_us.rename(columns=str.lower)
+    orders_us = orders_us.rename(columns={'transactionId': 'transaction_id', 'visitorId': 'visitor_id'})
+
+    contaminated = contamination(orders_us)
+    orders_us = orders_us[~contaminated.mask].reset_index(drop=True)
+
+    orders_us['group'] = orders_us['group'].astype('category')
+    visits_us = visits_us.assign(group=visits_us['group'].astype('category'))
+    return CleanedData(hypotheses_us, orders_us, visits_us, contaminated.visitors)
+
+
+def _cache_paths(cache_dir):
+    paths = {name: os.path.join(cache_dir, f'{name}.feather') for name in SOURCES}
+    paths['common_visitors'] = os.path.join(cache_dir, 'common_visitors.feather')
+    return paths
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_cleaned(datasets_dir='files/datasets', cache_dir=None):
+    """Devuelve los datasets limpios, desde la caché si sigue vigente.
+
+    La caché se considera vigente si su versión y el hash de cada CSV de
+    origen coinciden con los guardados en `manifest.json`.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return clean_datasets(*read_sources(datasets_dir))
+
+    cache_dir = cache_dir or os.path.join(datasets_dir, 'cache')
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    paths = _cache_paths(cache_dir)
+    hashes = {name: file_hash(os.path.join(datasets_dir, source)) for name, source in SOURCES.items()}
+
+    manifest = _read_manifest(manifest_path)
+    if manifest == {'version': CACHE_VERSION, 'sources': hashes} and all(map(os.path.exists, paths.values())):
+        tables = {name: feather.read_table(path, memory_map=True).to_pandas() for name, path in paths.items()}
+        return CleanedData(tables['hypotheses_us'], tables['orders_us'], tables['visits_us'],
+                           tables['common_visitors']['visitor_id'].to_numpy())
+
+    cleaned = clean_datasets(*read_sources(datasets_dir))
+    os.makedirs(cache_dir, exist_ok=True)
+    frames = cleaned._asdict()
+    frames['common_visitors'] = pd.DataFrame({'visitor_id': cleaned.common_visitors})
+    for name, frame in frames.items():
+        # sin compresión para que la lectura con memory-map no tenga que descomprimir
+        tmp_path = paths[name] + '.tmp'
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), tmp_path,
+                              compression='uncompressed')
+        os.replace(tmp_path, paths[name])
+
+    # el manifiesto se escribe al final para que una caché a medio escribir no se dé por válida
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'sources': hashes}, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return cleaned
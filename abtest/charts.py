@@ -0,0 +1,116 @@
+"""Gráficos del análisis sin depender de una pantalla.
+
+Cada gráfico se describe con un `Chart` (sólo datos, se puede enviar a otro
+proceso) y se dibuja con `render`, que usa directamente una `Figure` de
+matplotlib con el backend Agg en lugar de `pyplot`. `draw` dibuja el mismo
+`Chart` sobre unos ejes existentes, por ejemplo en el notebook.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+Chart = namedtuple('Chart', ('name', 'title', 'xlabel', 'ylabel', 'series', 'kind', 'hlines', 'figsize'))
+Chart.__new__.__defaults__ = ('line', (), (10, 6))
+
+PERCENTILE_STYLES = ({'color': 'orange', 'linestyle': '--'}, {'color': 'red', 'linestyle': '--'})
+
+
+def line_chart(name, title, xlabel, ylabel, series, hlines=(), figsize=(10, 6)):
+    """`series` es una lista de `(etiqueta, x, y)`."""
+    return Chart(name, title, xlabel, ylabel, _as_arrays(series), 'line', tuple(hlines), figsize)
+
+
+def scatter_chart(name, title, xlabel, ylabel, series, hlines=(), figsize=(8, 6), mode='sample',
+                  max_points=20_000, percentiles=None, seed=None):
+    """Gráfico de dispersión que no crece con el número de filas.
+
+    - `mode='sample'`: se conservan los valores extremos y una muestra
+      estratificada del resto (ver `downsample`).
+    - `mode='density'`: se dibuja un ráster 2-D con el número de puntos por celda.
+    - `mode='full'`: todos los puntos, como `plt.scatter`.
+
+    `percentiles` es un dict `{95: valor, 99: valor}` (por ejemplo de un
+    sketch de cuantiles); se dibujan como líneas de referencia horizontales.
+    """
+    hlines = list(hlines)
+    for (p, value), style in zip(sorted((percentiles or {}).items()), PERCENTILE_STYLES):
+        hlines.append((float(value), {**style, 'label': f'percentil {p}'}))
+
+    if mode == 'full':
+        return Chart(name, title, xlabel, ylabel, _as_arrays(series), 'scatter', tuple(hlines), figsize)
+    if mode == 'sample':
+        threshold = max((value for value, _ in hlines), default=None)
+        reduced = [(label, *downsample(x, y, max_points, threshold, seed)) for label, x, y in _as_arrays(series)]
+        return Chart(name, title, xlabel, ylabel, reduced, 'scatter', tuple(hlines), figsize)
+    if mode == 'density':
+        rasters = [(label, *np.histogram2d(x, y, bins=(200, 100))) for label, x, y in _as_arrays(series)]
+        return Chart(name, title, xlabel, ylabel, rasters, 'density', tuple(hlines), figsize)
+    raise ValueError("mode debe ser 'sample', 'density' o 'full'")
+
+
+def downsample(x, y, max_points=20_000, threshold=None, seed=None):
+    """Reduce una nube de puntos a lo sumo a `max_points`.
+
+    Se conservan los puntos con `y` por encima de `threshold` (los valores
+    extremos; si son demasiados, los de mayor `y`) y el resto del cupo se
+    llena con una muestra estratificada: el eje se divide en tramos
+    consecutivos y se toma un punto al azar de cada tramo. El costo es lineal
+    en el número de puntos, sin ordenar.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = y.shape[0]
+    if n <= max_points:
+        return x, y
+
+    extremes = np.flatnonzero(y > threshold) if threshold is not None else np.empty(0, dtype=np.int64)
+    max_extremes = max_points // 2
+    if extremes.size > max_extremes:
+        extremes = extremes[np.argpartition(y[extremes], extremes.size - max_extremes)[-max_extremes:]]
+
+    budget = max_points - extremes.size
+    rng = np.random.default_rng(seed)
+    stratum = n / budget
+    sample = np.floor(np.arange(budget) * stratum + rng.uniform(0, stratum, budget)).astype(np.int64)
+    keep = np.union1d(sample.clip(max=n - 1), extremes)
+    return x[keep], y[keep]
+
+
+def _as_arrays(series):
+    return [(label, np.asarray(x), np.asarray(y)) for label, x, y in series]
+
+
+def draw(chart, ax):
+    """Dibuja `chart` sobre los ejes `ax`."""
+    from matplotlib.colors import LogNorm
+
+    for label, *data in chart.series:
+        if chart.kind == 'density':
+            counts, xedges, yedges = data
+            mesh = ax.pcolormesh(xedges, yedges, np.ma.masked_equal(counts.T, 0), norm=LogNorm(), cmap='viridis')
+            ax.figure.colorbar(mesh, ax=ax, label='puntos')
+        elif chart.kind == 'scatter':
+            ax.scatter(*data, label=label or None)
+        else:
+            ax.plot(*data, label=label or None)
+    for y, style in chart.hlines:
+        ax.axhline(y=y, **style)
+
+    if ax.get_legend_handles_labels()[1]:
+        ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_title(chart.title)
+    ax.set_xlabel(chart.xlabel, fontsize=12)
+    ax.set_ylabel(chart.ylabel, fontsize=12)
+
+
+def render(chart, path):
+    """Dibuja `chart` y lo guarda en `path` (el formato sale de la extensión, por ejemplo PNG o SVG)."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=chart.figsize)
+    draw(chart, fig.subplots())
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
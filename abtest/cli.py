@@ -0,0 +1,147 @@
+"""Línea de comandos del análisis: `python -m abtest <subcomando>`.
+
+Subcomandos:
+
+    prioritize  hipótesis con mayor puntaje ICE/RICE
+    cumulative  métricas acumuladas por día y grupo
+    test        pruebas de Mann-Whitney de conversión y tamaño de pedido
+    validate    revisiones de calidad de datos; termina con código 1 si alguna falla
+    report      reporte completo con gráficos (ver `abtest.report`)
+
+Cada subcomando importa sólo lo que necesita: `prioritize` no carga scipy,
+matplotlib ni los pedidos, y sólo `report` importa matplotlib.
+"""
+
+import argparse
+import sys
+
+
+def _print_frame(frame, as_json, output=None):
+    if output:
+        frame.to_csv(output, index=False)
+    elif as_json:
+        print(frame.to_json(orient='records', date_format='iso', force_ascii=False))
+    else:
+        print(frame.to_string(index=False))
+
+
+def prioritize(args):
+    from abtest.cache import load_hypotheses
+    from abtest.prioritization import Prioritizer
+
+    prioritizer = Prioritizer(load_hypotheses(args.datasets))
+    top = prioritizer.top_k(args.k, by=args.by, per_team=args.per_team)
+    _print_frame(top, args.json)
+
+
+def cumulative(args):
+    import os
+
+    from abtest.cumulative import cumulative_from_daily
+    from abtest.loading import load_aggregates
+
+    # se leen los CSV por bloques: la memoria depende de los agregados y no del tamaño de los archivos
+    aggregates = load_aggregates(os.path.join(args.datasets, 'orders_us.csv'),
+                                 os.path.join(args.datasets, 'visits_us.csv'), chunksize=args.chunksize)
+    cumulativeData = cumulative_from_daily(aggregates.daily_orders, aggregates.daily_visits)
+    cumulativeData['conversion'] = cumulativeData['orders'] / cumulativeData['visitors']
+    _print_frame(cumulativeData, args.json, args.output)
+
+
+def test(args):
+    from abtest.anomalies import AnomalyFilter, order_count_percentile, revenue_percentile
+    from abtest.cache import load_cleaned
+    from abtest.quantiles import QuantileSketch
+    from abtest.users import UserOrders
+    from abtest.variants import VariantAnalysis
+
+    cleaned = load_cleaned(args.datasets)
+    users = UserOrders.from_orders(cleaned.orders_us)
+    variants = VariantAnalysis(cleaned.orders_us, cleaned.visits_us, control=args.control, users=users)
+    exclude = None
+    if args.exclude_anomalies is not None:
+        orders_sketch = QuantileSketch(seed=42).update(users.table['orders'])
+        revenue_sketch = QuantileSketch(seed=42).update(cleaned.orders_us['revenue'])
+        exclude = AnomalyFilter(users, [order_count_percentile(args.exclude_anomalies, orders_sketch),
+                                        revenue_percentile(args.exclude_anomalies, revenue_sketch)]).order_mask
+    _print_frame(variants.compare(args.mode, exclude=exclude), args.json)
+
+    if args.cuped:
+        from abtest.cuped import cuped_compare, load_pre_period
+
+        covariates = load_pre_period(args.datasets)
+        if covariates is None:
+            sys.exit(f'--cuped necesita {args.datasets}/pre_orders_us.csv con los pedidos previos al test')
+        _print_frame(cuped_compare(variants, covariates, args.mode), args.json)
+
+
+def validate(args):
+    from abtest.cache import load_cleaned
+    from abtest.validation import validate as validate_data
+
+    cleaned = load_cleaned(args.datasets)
+    report = validate_data(cleaned.orders_us, cleaned.visits_us, srm_alpha=args.srm_alpha, raise_on_failure=False)
+    print(report.to_json() if args.json else report)
+    return 0 if report.passed else 1
+
+
+def report(args):
+    from abtest.report import run
+
+    run(args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m abtest', description='Análisis del test A/B del proyecto 8.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(subparser):
+        subparser.add_argument('--datasets', default='files/datasets', help='carpeta con los CSV')
+        subparser.add_argument('--json', action='store_true', help='imprimir la tabla como JSON')
+
+    sub = subparsers.add_parser('prioritize', help='hipótesis con mayor puntaje ICE/RICE')
+    add_common(sub)
+    sub.add_argument('-k', type=int, default=3, help='número de hipótesis')
+    sub.add_argument('--by', default='ICE', choices=['ICE', 'RICE'])
+    sub.add_argument('--per-team', action='store_true', help='las k mejores de cada equipo')
+    sub.set_defaults(handler=prioritize)
+
+    sub = subparsers.add_parser('cumulative', help='métricas acumuladas por día y grupo')
+    add_common(sub)
+    sub.add_argument('--output', help='guardar como CSV en lugar de imprimir')
+    sub.add_argument('--chunksize', type=int, default=1_000_000, help='filas por bloque al leer los CSV')
+    sub.set_defaults(handler=cumulative)
+
+    sub = subparsers.add_parser('test', help='pruebas de Mann-Whitney entre grupos')
+    add_common(sub)
+    sub.add_argument('--control', default=None, help='grupo de control (por defecto el primero)')
+    sub.add_argument('--mode', default='control', choices=['control', 'all'],
+                     help='cada variante contra el control o todas las parejas')
+    sub.add_argument('--exclude-anomalies', type=float, nargs='?', const=95, default=None, metavar='PERCENTIL',
+                     help='quitar usuarios por encima de este percentil de pedidos o ingresos (por defecto 95)')
+    sub.add_argument('--cuped', action='store_true',
+                     help='agregar la prueba del tamaño de pedido ajustada con CUPED (necesita pre_orders_us.csv)')
+    sub.set_defaults(handler=test)
+
+    sub = subparsers.add_parser('validate', help='revisiones de calidad de datos y desbalance de grupos (SRM)')
+    add_common(sub)
+    sub.add_argument('--srm-alpha', type=float, default=0.001,
+                     help='nivel de la prueba chi-cuadrado de desbalance de visitas')
+    sub.set_defaults(handler=validate)
+
+    # las opciones de `report` se definen en abtest.report, que importa matplotlib sólo al dibujar
+    from abtest.report import add_arguments
+
+    sub = subparsers.add_parser('report', help='reporte completo con gráficos')
+    add_arguments(sub)
+    sub.set_defaults(handler=report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
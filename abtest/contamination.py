@@ -0,0 +1,35 @@
+"""Detección de usuarios presentes en más de un grupo del test."""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+Contamination = namedtuple('Contamination', ('mask', 'visitors', 'n_visitors', 'n_orders'))
+
+
+def contamination(orders_us, visitor_column='visitor_id', group_column='group'):
+    """Marca los pedidos de visitantes que aparecen en más de un grupo.
+
+    Funciona para cualquier número de variantes: se cuentan los grupos
+    distintos de cada visitante con `groupby(...).nunique()` sin crear objetos
+    de Python por id.
+
+    Devuelve `mask` (booleano alineado con `orders_us`), `visitors` (arreglo
+    ordenado de ids contaminados) y los totales de visitantes y pedidos
+    afectados.
+    """
+    groups_per_visitor = orders_us.groupby(visitor_column, sort=True, observed=True)[group_column].nunique()
+    visitors = groups_per_visitor.index.to_numpy()[groups_per_visitor.to_numpy() > 1]
+
+    # los ids contaminados están ordenados, así la pertenencia se resuelve con búsqueda binaria
+    ids = orders_us[visitor_column].to_numpy()
+    if visitors.size:
+        positions = np.searchsorted(visitors, ids).clip(max=visitors.size - 1)
+        mask = visitors[positions] == ids
+    else:
+        mask = np.zeros(ids.shape[0], dtype=bool)
+
+    return Contamination(pd.Series(mask, index=orders_us.index, name='contaminated'), visitors,
+                         int(visitors.size), int(mask.sum()))
@@ -0,0 +1,60 @@
+"""Métricas acumuladas diarias por grupo del test A/B."""
+
+import pandas as pd
+
+
+CUMULATIVE_COLUMNS = ['date', 'group', 'orders', 'buyers', 'revenue', 'visitors']
+
+
+def daily_order_totals(orders_us, keys=()):
+    """Totales diarios por grupo: pedidos nuevos, compradores nuevos e ingresos.
+
+    Un pedido o comprador se cuenta sólo el primer día en el que aparece dentro
+    de su grupo, así la suma acumulada de estas columnas es el número de
+    valores distintos hasta la fecha incluida. Con `keys` (columnas de
+    segmento) los totales se calculan por segmento, grupo y fecha.
+    """
+    keys = list(keys)
+    # se ordena una sola vez por grupo y fecha para que la primera aparición sea la más antigua
+    orders_us = orders_us.sort_values(by=[*keys, 'group', 'date'], kind='stable')
+
+    daily = pd.DataFrame({
+        **{key: orders_us[key] for key in keys},
+        'group': orders_us['group'],
+        'date': orders_us['date'],
+        'orders': ~orders_us.duplicated(subset=[*keys, 'group', 'transaction_id']),
+        'buyers': ~orders_us.duplicated(subset=[*keys, 'group', 'visitor_id']),
+        'revenue': orders_us['revenue'],
+    })
+    return daily.groupby([*keys, 'group', 'date'], sort=True, observed=True).sum()
+
+
+def daily_visit_totals(visits_us, keys=()):
+    """Visitas diarias por grupo (y por segmento si se pasan `keys`)."""
+    return visits_us.groupby([*keys, 'group', 'date'], sort=True, observed=True)[['visits']].sum()
+
+
+def cumulative_from_daily(daily_orders, daily_visits, keys=()):
+    """Construye `cumulativeData` a partir de los totales diarios por grupo.
+
+    Sólo se conservan las parejas fecha-grupo que tienen pedidos, igual que
+    cuando se parte de `datesGroups`.
+    """
+    keys = list(keys)
+    cumulative_orders = daily_orders.groupby(level=[*keys, 'group'], observed=True).cumsum()
+    cumulative_visits = daily_visits.groupby(level=[*keys, 'group'], observed=True).cumsum()
+
+    cumulativeData = cumulative_orders.join(cumulative_visits, how='inner').reset_index()
+    cumulativeData = cumulativeData.rename(columns={'visits': 'visitors'})
+    cumulativeData = cumulativeData.sort_values(by=[*keys, 'date', 'group']).reset_index(drop=True)
+    return cumulativeData[keys + CUMULATIVE_COLUMNS]
+
+
+def cumulative_metrics(orders_us, visits_us):
+    """Pedidos, compradores, ingresos y visitas acumulados por fecha y grupo.
+
+    Equivale a recorrer `datesGroups` filtrando `orders_us` y `visits_us` hasta
+    cada fecha, pero en una sola pasada: se ordena una vez y se acumulan los
+    totales diarios con `cumsum`.
+    """
+    return cumulative_from_daily(daily_order_totals(orders_us), daily_visit_totals(visits_us))
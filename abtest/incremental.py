@@ -0,0 +1,166 @@
+"""Modo incremental: se agrega un día a `cumulativeData` sin releer el historial."""
+
+import pickle
+
+import pandas as pd
+
+from abtest.cumulative import CUMULATIVE_COLUMNS, cumulative_metrics
+
+
+class CumulativeState:
+    """Totales acumulados por grupo y los ids vistos hasta la última fecha.
+
+    Guarda, para cada grupo, los pedidos, compradores, ingresos y visitas
+    acumulados, el conjunto de `transaction_id` ya contados y los pedidos e
+    ingresos de cada comprador. Con eso cada día nuevo se procesa en tiempo
+    proporcional a sus propios datos. `excluded` son los usuarios que compran
+    en más de un grupo: los que ya quitó `load_cleaned` (`common_visitors`) y
+    los que aparecen en otro grupo en un día agregado después.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.transactions = {}
+        # por grupo, visitor_id -> [pedidos, ingresos]
+        self.buyers = {}
+        self.excluded = set()
+        self.last_date = None
+
+    @classmethod
+    def from_history(cls, orders_us, visits_us, excluded=()):
+        """Construye el estado y `cumulativeData` a partir del historial completo.
+
+        `orders_us` ya debe venir sin los usuarios de `excluded`, como la
+        devuelve `load_cleaned` junto con `common_visitors`.
+        """
+        state = cls()
+        state.excluded = set(excluded)
+        for group, group_orders in orders_us.groupby('group', observed=True):
+            state.transactions[group] = set(group_orders['transaction_id'].tolist())
+            per_buyer = group_orders.groupby('visitor_id').agg(orders=('transaction_id', 'nunique'),
+                                                               revenue=('revenue', 'sum'))
+            state.buyers[group] = {visitor: [int(orders), float(revenue)]
+                                   for visitor, orders, revenue in per_buyer.itertuples()}
+
+        for group in set(orders_us['group']) | set(visits_us['group']):
+            group_orders = orders_us[orders_us['group'] == group]
+            state.totals[group] = {
+                'orders': len(state.transactions.get(group, ())),
+                'buyers': len(state.buyers.get(group, ())),
+                'revenue': float(group_orders['revenue'].sum()),
+                'visitors': int(visits_us.loc[visits_us['group'] == group, 'visits'].sum()),
+            }
+            state.transactions.setdefault(group, set())
+            state.buyers.setdefault(group, {})
+
+        state.last_date = max(orders_us['date'].max(), visits_us['date'].max())
+        return state, cumulative_metrics(orders_us, visits_us)
+
+    def append_day(self, orders_day, visits_day):
+        """Agrega los pedidos y visitas de un día nuevo.
+
+        Los pedidos de usuarios de `excluded` no se cuentan. Si un usuario
+        compra ese día en un grupo distinto al de sus pedidos anteriores (o en
+        dos grupos el mismo día), se agrega a `excluded` y sus pedidos e
+        ingresos anteriores se restan de los totales, como si `load_cleaned`
+        lo hubiera quitado; las filas ya devueltas de días anteriores no
+        cambian. Devuelve las filas nuevas de `cumulativeData` (una por grupo
+        con pedidos ese día, como en `datesGroups`).
+        """
+        dates = set(orders_day['date']) | set(visits_day['date'])
+        if len(dates) != 1:
+            raise ValueError('orders_day y visits_day deben contener exactamente una fecha')
+        date = dates.pop()
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f'la fecha {date} ya está incluida en el estado (última: {self.last_date})')
+
+        for group, visits in visits_day.groupby('group', observed=True)['visits'].sum().items():
+            self._group_totals(group)['visitors'] += int(visits)
+
+        orders_day = orders_day[~orders_day['visitor_id'].isin(self.excluded)]
+        self._exclude(self._contaminated(orders_day))
+        orders_day = orders_day[~orders_day['visitor_id'].isin(self.excluded)]
+
+        rows = []
+        for group, group_orders in orders_day.groupby('group', observed=True):
+            totals = self._group_totals(group)
+            transactions = self.transactions[group]
+            buyers = self.buyers[group]
+
+            new_orders = group_orders[~group_orders['transaction_id'].isin(transactions)]
+            new_orders = new_orders.drop_duplicates('transaction_id')
+            transactions.update(new_orders['transaction_id'].tolist())
+            per_buyer = new_orders.groupby('visitor_id').agg(orders=('transaction_id', 'size'),
+                                                             revenue=('revenue', 'sum'))
+            for visitor, orders, revenue in per_buyer.itertuples():
+                if visitor not in buyers:
+                    buyers[visitor] = [0, 0.0]
+                    totals['buyers'] += 1
+                buyers[visitor][0] += int(orders)
+                buyers[visitor][1] += float(revenue)
+
+            totals['orders'] += len(new_orders)
+            totals['revenue'] += float(new_orders['revenue'].sum())
+            rows.append([date, group, totals['orders'], totals['buyers'], totals['revenue'], totals['visitors']])
+
+        self.last_date = date
+        return pd.DataFrame(rows, columns=CUMULATIVE_COLUMNS).sort_values(by='group').reset_index(drop=True)
+
+    def _contaminated(self, orders_day):
+        """Usuarios de `orders_day` que compran en más de un grupo, contando los días anteriores."""
+        day_groups = orders_day.groupby('visitor_id')['group'].nunique()
+        contaminated = set(day_groups.index[day_groups > 1])
+        for group, visitors in orders_day.groupby('group', observed=True)['visitor_id']:
+            visitors = set(visitors.tolist())
+            for other_group, other_buyers in self.buyers.items():
+                if other_group != group:
+                    contaminated.update(visitors & other_buyers.keys())
+        return contaminated
+
+    def _exclude(self, visitors):
+        """Agrega `visitors` a `excluded` y resta sus pedidos e ingresos de los totales de cada grupo."""
+        for group, buyers in self.buyers.items():
+            totals = self.totals[group]
+            for visitor in visitors & buyers.keys():
+                orders, revenue = buyers.pop(visitor)
+                totals['orders'] -= orders
+                totals['buyers'] -= 1
+                totals['revenue'] -= revenue
+        self.excluded.update(visitors)
+
+    def _group_totals(self, group):
+        self.transactions.setdefault(group, set())
+        self.buyers.setdefault(group, {})
+        return self.totals.setdefault(group, {'orders': 0, 'buyers': 0, 'revenue': 0.0, 'visitors': 0})
+
+    def save(self, path):
+        """Guarda el estado en disco."""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        """Lee un estado guardado con `save`."""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def merge_groups(rows, columns, groups=('A', 'B')):
+    """Une las columnas de dos grupos por fecha con sufijos, como `mergedCumulativeRevenue`."""
+    first, second = groups
+    left = rows[rows['group'] == first][['date'] + columns]
+    right = rows[rows['group'] == second][['date'] + columns]
+    return left.merge(right, left_on='date', right_on='date', how='left', suffixes=[first, second])
+
+
+def day_rows(new_rows, groups=('A', 'B')):
+    """Filas de un día nuevo para `cumulativeData`, `mergedCumulativeRevenue` y `mergedCumulativeConversions`.
+
+    `new_rows` son las filas que devuelve `CumulativeState.append_day`. Sólo
+    se calculan las filas de ese día; el que llama las agrega al final de sus
+    tablas (o a un almacenamiento de sólo agregado) sin copiar el historial.
+    """
+    new_rows = new_rows.assign(conversion=new_rows['orders'] / new_rows['visitors'])
+    return (new_rows,
+            merge_groups(new_rows, ['revenue', 'orders'], groups),
+            merge_groups(new_rows, ['conversion'], groups))
@@ -0,0 +1,160 @@
+"""Medición por etapas del análisis: tiempo, memoria y filas de entrada/salida.
+
+Cada etapa se envuelve con `Instrument.stage`; al salir se emite una línea
+JSON con sus métricas:
+
+    {"run": "...", "stage": "cumulative", "seconds": 0.41, "rss_start_mb": 231.2,
+     "peak_rss_mb": 269.5, "rss_delta_mb": 38.3, "rows_in": 946000, "rows_out": 62}
+
+En Linux el pico de memoria residente se reinicia al empezar cada etapa
+(`/proc/self/clear_refs`), así `peak_rss_mb` es el pico de la etapa y
+`rss_delta_mb` lo que subió respecto del inicio. Donde no se puede reiniciar
+sólo se emite `process_peak_rss_mb`, el pico de todo el proceso hasta ese
+momento. Las etapas no deben anidarse: la interna reinicia el pico de la
+externa.
+
+Con `profile=('cprofile', 'tracemalloc')` se agregan, por etapa, las
+funciones más costosas según cProfile y el pico de memoria asignada según
+tracemalloc. Ambos agregan costo, por eso están apagados por defecto. También
+se pueden activar con las variables de entorno `ABTEST_METRICS` (ruta del
+archivo JSON lines, o `-` para stderr) y `ABTEST_PROFILE`
+(`cprofile,tracemalloc`).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+
+def process_peak_rss_mb():
+    """Pico de memoria residente del proceso hasta ahora, en MiB."""
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def rss_mb():
+    """`(memoria residente actual, pico)` en MiB según `/proc/self/status`, o `None` fuera de Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(status['VmRSS'].split()[0]) / (1 << 10), int(status['VmHWM'].split()[0]) / (1 << 10)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def reset_peak_rss():
+    """Reinicia el pico de memoria residente del proceso; devuelve `False` si no se puede."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _top_functions(profiler, limit):
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{'function': pstats.func_std_string(func), 'calls': nc, 'cumulative_seconds': ct}
+            for func, (cc, nc, tt, ct, callers) in top]
+
+
+class Instrument:
+    """Registra las métricas de cada etapa y las escribe como JSON lines en `sink`.
+
+    `sink` puede ser una ruta (se abre en modo append), un archivo abierto o
+    `None` para sólo guardar los registros en `records`. Con `profile_dir`,
+    el perfil completo de cProfile de cada etapa se guarda en
+    `<profile_dir>/<etapa>.prof` para abrirlo con `pstats` o snakeviz.
+    """
+
+    def __init__(self, sink=None, profile=(), profile_dir=None, run_id=None, top=15):
+        unknown = set(profile) - set(PROFILERS)
+        if unknown:
+            raise ValueError(f'perfiles desconocidos: {sorted(unknown)}; opciones: {PROFILERS}')
+        self.sink = sink
+        self.profile = frozenset(profile)
+        self.profile_dir = profile_dir
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.top = top
+        self.records = []
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Instrumento configurado con `ABTEST_METRICS` y `ABTEST_PROFILE`."""
+        sink = os.environ.get('ABTEST_METRICS') or None
+        if sink == '-':
+            sink = sys.stderr
+        profile = [name.strip() for name in os.environ.get('ABTEST_PROFILE', '').split(',') if name.strip()]
+        return cls(sink=sink, profile=profile, **kwargs)
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Mide el bloque `with`; se le puede asignar `metrics['rows_out']` dentro.
+
+        Si el bloque lanza una excepción, la línea se emite igual con
+        `"error"` y la excepción se propaga.
+        """
+        metrics = {'run': self.run_id, 'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        trace = 'tracemalloc' in self.profile
+        # si tracemalloc ya estaba activo (por ejemplo en una etapa externa) no se detiene al salir
+        started_tracing = trace and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if trace:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile() if 'cprofile' in self.profile else None
+        rss_start = rss_mb() if reset_peak_rss() else None
+
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield metrics
+        except BaseException as error:
+            metrics['error'] = repr(error)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            metrics['seconds'] = time.perf_counter() - start
+            rss = rss_mb() if rss_start is not None else None
+            if rss is not None:
+                metrics['rss_start_mb'] = rss_start[0]
+                metrics['peak_rss_mb'] = rss[1]
+                metrics['rss_delta_mb'] = rss[1] - rss_start[0]
+            else:
+                metrics['process_peak_rss_mb'] = process_peak_rss_mb()
+            if trace:
+                metrics['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler is not None:
+                metrics['profile'] = _top_functions(profiler, self.top)
+                if self.profile_dir:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    profiler.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+            self._emit(metrics)
+
+    def _emit(self, metrics):
+        self.records.append(metrics)
+        if self.sink is None:
+            return
+        line = json.dumps(metrics, default=str) + '\n'
+        if isinstance(self.sink, (str, os.PathLike)):
+            with open(self.sink, 'a', encoding='utf-8') as f:
+                f.write(line)
+        else:
+            self.sink.write(line)
+            self.sink.flush()
@@ -0,0 +1,179 @@
+"""Lectura por bloques de `orders_us.csv` y `visits_us.csv` con tipos compactos.
+
+Cada bloque se reduce de inmediato a los agregados que usa el análisis (totales
+por día y grupo, pedidos por visitante), de modo que la memoria máxima depende
+del tamaño de los agregados y no del archivo completo.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from abtest.contamination import contamination
+from abtest.quantiles import sketch_by
+
+
+ORDERS_COLUMNS = {'transactionId': 'transaction_id', 'visitorId': 'visitor_id'}
+ORDERS_DTYPES = {'transactionId': 'uint64', 'visitorId': 'uint64', 'revenue': 'float64', 'group': 'category', 'date': 'str'}
+VISITS_DTYPES = {'group': 'category', 'visits': 'uint32', 'date': 'str'}
+
+# los agregados parciales se combinan cada tantos bloques para acotar la memoria
+COMPACT_EVERY = 8
+
+StreamAggregates = namedtuple('StreamAggregates',
+                              ('daily_orders', 'daily_visits', 'users', 'contaminated', 'revenue_sketches'))
+
+
+def _to_days(dates):
+    """Convierte fechas 'YYYY-MM-DD' a días desde 1970-01-01 en int32 (equivalente a date32)."""
+    return pd.to_datetime(dates, format='%Y-%m-%d').to_numpy().astype('datetime64[D]').astype(np.int32)
+
+
+def _from_days(days):
+    # datetime64[ns], como las fechas que devuelve `pd.read_csv(..., parse_dates=...)`
+    return pd.to_datetime(np.asarray(days, dtype='int64').astype('datetime64[D]').astype('datetime64[ns]'))
+
+
+def read_orders_chunks(path, chunksize=1_000_000):
+    """Lee `orders_us.csv` por bloques con tipos compactos.
+
+    Cada bloque tiene las columnas `transaction_id`, `visitor_id` (uint64),
+    `date` (int32, días desde 1970-01-01), `revenue_cents` (int64, ingresos en
+    centavos; admite devoluciones negativas y montos grandes) y `group`
+    (categórica).
+    """
+    for chunk in pd.read_csv(path, dtype=ORDERS_DTYPES, chunksize=chunksize):
+        chunk = chunk.rename(columns=ORDERS_COLUMNS)
+        revenue = chunk['revenue'].to_numpy()
+        if not np.isfinite(revenue).all():
+            raise ValueError(f'{path}: hay pedidos sin ingreso o con un ingreso no finito')
+        yield pd.DataFrame({
+            'transaction_id': chunk['transaction_id'].to_numpy(),
+            'visitor_id': chunk['visitor_id'].to_numpy(),
+            'date': _to_days(chunk['date']),
+            'revenue_cents': np.rint(revenue * 100).astype(np.int64),
+            'group': chunk['group'],
+        })
+
+
+def read_visits_chunks(path, chunksize=1_000_000):
+    """Lee `visits_us.csv` por bloques con tipos compactos."""
+    for chunk in pd.read_csv(path, dtype=VISITS_DTYPES, chunksize=chunksize):
+        chunk['date'] = _to_days(chunk['date'])
+        yield chunk
+
+
+def _reduce(parts, keys, aggregations):
+    """Combina agregados parciales en uno solo."""
+    combined = pd.concat(parts, ignore_index=True)
+    combined['group'] = combined['group'].astype('category')
+    return combined.groupby(keys, observed=True, sort=False).agg(**aggregations).reset_index()
+
+
+_USER_AGGREGATIONS = {
+    'orders': ('orders', 'sum'),
+    'revenue_cents': ('revenue_cents', 'sum'),
+    'max_revenue_cents': ('max_revenue_cents', 'max'),
+    'first_date': ('first_date', 'min'),
+    'last_date': ('last_date', 'max'),
+}
+
+_DAILY_AGGREGATIONS = {
+    'orders': ('orders', 'sum'),
+    'revenue_cents': ('revenue_cents', 'sum'),
+}
+
+
+def _user_totals(orders_path, chunksize):
+    """Primera pasada: pedidos, ingresos y primera/última fecha por visitante y grupo."""
+    parts = []
+    for chunk in read_orders_chunks(orders_path, chunksize):
+        parts.append(chunk.groupby(['visitor_id', 'group'], observed=True, sort=False).agg(
+            orders=('transaction_id', 'size'),
+            revenue_cents=('revenue_cents', 'sum'),
+            max_revenue_cents=('revenue_cents', 'max'),
+            first_date=('date', 'min'),
+            last_date=('date', 'max'),
+        ).reset_index())
+        if len(parts) >= COMPACT_EVERY:
+            parts = [_reduce(parts, ['visitor_id', 'group'], _USER_AGGREGATIONS)]
+    return _reduce(parts, ['visitor_id', 'group'], _USER_AGGREGATIONS)
+
+
+def _daily_totals(orders_path, chunksize, contaminated):
+    """Segunda pasada: pedidos, ingresos y sketch de ingresos por día y grupo sin los visitantes excluidos."""
+    parts = []
+    sketches = {}
+    for chunk in read_orders_chunks(orders_path, chunksize):
+        if contaminated.size:
+            chunk = chunk[~np.isin(chunk['visitor_id'].to_numpy(), contaminated)]
+        parts.append(chunk.groupby(['date', 'group'], observed=True, sort=False).agg(
+            orders=('transaction_id', 'size'),
+            revenue_cents=('revenue_cents', 'sum'),
+        ).reset_index())
+        sketch_by(chunk.assign(revenue=chunk['revenue_cents'] / 100), 'revenue', ['date', 'group'],
+                  sketches=sketches)
+        if len(parts) >= COMPACT_EVERY:
+            parts = [_reduce(parts, ['date', 'group'], _DAILY_AGGREGATIONS)]
+    return _reduce(parts, ['date', 'group'], _DAILY_AGGREGATIONS), sketches
+
+
+def load_aggregates(orders_path='files/datasets/orders_us.csv', visits_path='files/datasets/visits_us.csv',
+                    chunksize=1_000_000):
+    """Lee ambos archivos por bloques y devuelve sólo los agregados del análisis.
+
+    - `daily_orders`: pedidos, compradores nuevos e ingresos por grupo y fecha,
+      en el formato de `cumulative.daily_order_totals`.
+    - `daily_visits`: visitas por grupo y fecha.
+    - `users`: pedidos, ingresos, ingreso máximo y primera/última fecha por
+      visitante y grupo.
+    - `contaminated`: ids de visitantes con pedidos en más de un grupo; ya
+      están excluidos de `daily_orders` y `users`.
+    - `revenue_sketches`: sketch de cuantiles de los ingresos por pedido para
+      cada (fecha, grupo); se combinan con `quantiles.merge_sketches`.
+
+    Se cuenta una fila por pedido, es decir, se asume que `transactionId` no
+    se repite dentro del archivo. Los tipos son los del camino en memoria
+    (`group` categórica, fechas en datetime64[ns]), así que
+    `cumulative_from_daily(daily_orders, daily_visits)` es igual a
+    `cumulative_metrics` sobre los datos de `load_cleaned`.
+    """
+    users = _user_totals(orders_path, chunksize)
+
+    contaminated = contamination(users)
+    users = users[~contaminated.mask].reset_index(drop=True)
+
+    daily, sketches = _daily_totals(orders_path, chunksize, contaminated.visitors)
+    # un comprador es nuevo el día de su primer pedido dentro del grupo
+    buyers = users.groupby(['first_date', 'group'], observed=True).size().rename('buyers')
+    buyers.index = buyers.index.set_names(['date', 'group'])
+    daily = daily.set_index(['date', 'group']).join(buyers, how='left').fillna({'buyers': 0}).reset_index()
+
+    daily_orders = pd.DataFrame({
+        'group': daily['group'].astype(str).astype('category'),
+        'date': _from_days(daily['date']),
+        'orders': daily['orders'].astype(np.int64),
+        'buyers': daily['buyers'].astype(np.int64),
+        'revenue': daily['revenue_cents'].to_numpy() / 100,
+    }).set_index(['group', 'date']).sort_index()
+
+    visits = _reduce(list(read_visits_chunks(visits_path, chunksize)), ['date', 'group'],
+                     {'visits': ('visits', 'sum')})
+    daily_visits = pd.DataFrame({
+        'group': visits['group'].astype(str).astype('category'),
+        'date': _from_days(visits['date']),
+        'visits': visits['visits'].astype(np.int64),
+    }).set_index(['group', 'date']).sort_index()
+
+    users = pd.DataFrame({
+        'visitor_id': users['visitor_id'].to_numpy().astype(np.int64),
+        'group': users['group'].astype(str).astype('category'),
+        'orders': users['orders'].to_numpy().astype(np.uint32),
+        'revenue': users['revenue_cents'].to_numpy() / 100,
+        'max_revenue': users['max_revenue_cents'].to_numpy() / 100,
+        'first_date': _from_days(users['first_date']),
+        'last_date': _from_days(users['last_date']),
+    })
+    revenue_sketches = {(_from_days([date])[0], str(group)): sketch for (date, group), sketch in sketches.items()}
+    return StreamAggregates(daily_orders, daily_visits, users, contaminated.visitors, revenue_sketches)
@@ -0,0 +1,32 @@
+"""Reparto de tareas en un pool de procesos y semillas por bloque de simulación."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def run_tasks(fn, tasks, workers=None, initializer=None, initargs=()):
+    """Lista con `fn(*task)` para cada tupla de `tasks`, en el mismo orden.
+
+    `workers=None` usa un proceso por núcleo; con `workers=1` o una sola
+    tarea todo se evalúa en el proceso actual, después de llamar a
+    `initializer(*initargs)` igual que lo haría cada proceso del pool.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    if workers == 1 or len(tasks) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [fn(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(fn, *zip(*tasks)))
+
+
+def seeded_chunks(total, chunk, seed=None):
+    """Pares `(tamaño, semilla)` que reparten `total` simulaciones en bloques de a lo sumo `chunk`.
+
+    Las semillas salen de `SeedSequence(seed).spawn`, así los bloques son
+    independientes y el resultado no depende de cuántos procesos los evalúen.
+    """
+    sizes = [min(chunk, total - start) for start in range(0, total, chunk)]
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
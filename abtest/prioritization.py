@@ -0,0 +1,135 @@
+"""Priorización de hipótesis con ICE, RICE y puntajes ponderados."""
+
+import numpy as np
+import pandas as pd
+
+from abtest.parallel import run_tasks, seeded_chunks
+
+
+SCORE_COLUMNS = ['reach', 'impact', 'confidence', 'effort']
+
+# exponentes de cada columna: ICE ignora el alcance, RICE lo multiplica
+ICE_WEIGHTS = {'reach': 0, 'impact': 1, 'confidence': 1, 'effort': 1}
+RICE_WEIGHTS = {'reach': 1, 'impact': 1, 'confidence': 1, 'effort': 1}
+
+
+def weighted_score(reach, impact, confidence, effort, weights):
+    """`reach**wr * impact**wi * confidence**wc / effort**we` sobre arreglos completos."""
+    score = np.ones(np.broadcast(reach, impact, confidence, effort).shape)
+    for values, column in zip((reach, impact, confidence), ('reach', 'impact', 'confidence')):
+        if weights.get(column, 0):
+            score = score * np.power(values, weights[column], dtype=np.float64)
+    if weights.get('effort', 0):
+        score = score / np.power(effort, weights['effort'], dtype=np.float64)
+    return score
+
+
+def top_k_positions(scores, k):
+    """Posiciones de los `k` puntajes más altos, en orden descendente.
+
+    Usa `np.partition` en lugar de ordenar todo el arreglo; los empates se
+    resuelven por posición para que el resultado sea determinista.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if k >= scores.size:
+        candidates = np.arange(scores.size)
+    else:
+        kth = np.partition(scores, scores.size - k)[scores.size - k]
+        candidates = np.flatnonzero(scores >= kth)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+class Prioritizer:
+    """Puntajes ICE, RICE y ponderados de una tabla de hipótesis.
+
+    Los puntajes se calculan en una sola pasada vectorizada; `update` cambia
+    valores de algunas hipótesis y recalcula sólo esas filas. Si la tabla
+    tiene una columna `team`, `top_k` puede devolver los mejores por equipo.
+    """
+
+    def __init__(self, hypotheses, weights=None, team_column='team'):
+        self.hypotheses = hypotheses
+        self.values = {column: hypotheses[column].to_numpy(dtype=np.float64, copy=True) for column in SCORE_COLUMNS}
+        self.weights = {'ICE': ICE_WEIGHTS, 'RICE': RICE_WEIGHTS, **(weights or {})}
+        self.teams = hypotheses[team_column].to_numpy() if team_column in hypotheses.columns else None
+        # columnas cambiadas con `update`; `frame` las toma de `values` y no de la tabla original
+        self._updated = set()
+        self.scores = {name: self._score(name, slice(None)) for name in self.weights}
+
+    def _score(self, name, rows):
+        return weighted_score(*(self.values[column][rows] for column in SCORE_COLUMNS), self.weights[name])
+
+    def frame(self):
+        """Tabla de hipótesis, con los valores cambiados por `update`, y una columna por puntaje."""
+        updated = {column: self.values[column] for column in SCORE_COLUMNS if column in self._updated}
+        return self.hypotheses.assign(**updated, **self.scores)
+
+    def update(self, positions, **values):
+        """Cambia `reach`, `impact`, `confidence` o `effort` de las filas `positions` y recalcula sus puntajes."""
+        positions = np.atleast_1d(positions)
+        for column, new_values in values.items():
+            if column not in self.values:
+                raise ValueError(f'columna desconocida: {column!r}')
+            self.values[column][positions] = new_values
+            self._updated.add(column)
+        for name in self.scores:
+            self.scores[name][positions] = self._score(name, positions)
+
+    def top_k(self, k, by='ICE', per_team=False):
+        """Hipótesis con los `k` puntajes más altos (por equipo si `per_team`)."""
+        scores = self.scores[by]
+        if not per_team:
+            positions = top_k_positions(scores, k)
+        else:
+            if self.teams is None:
+                raise ValueError('la tabla de hipótesis no tiene columna de equipo')
+            codes, _ = pd.factorize(self.teams, sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(codes.max(initial=-1) + 2))
+            positions = np.concatenate([order[start:stop][top_k_positions(scores[order[start:stop]], k)]
+                                        for start, stop in zip(bounds[:-1], bounds[1:])] or [np.empty(0, int)])
+        return self.frame().iloc[positions]
+
+
+def _simulate_top_k(points, spreads, weights, k, n_sims, seed):
+    """Cuenta cuántas veces cada hipótesis queda entre las `k` mejores en `n_sims` simulaciones."""
+    rng = np.random.default_rng(seed)
+    # cada puntaje se simula como normal alrededor del valor estimado, acotada a la escala 1-10
+    draws = np.clip(rng.normal(points, spreads, size=(n_sims,) + points.shape), 1, 10)
+    scores = weighted_score(*np.moveaxis(draws, -1, 0), weights)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.bincount(top.ravel(), minlength=points.shape[0])
+
+
+def top_k_probability(hypotheses, k=3, by='RICE', n_sims=1_000_000, spread=1.0, seed=None,
+                      max_cells=1 << 22, workers=None, weights=None):
+    """Probabilidad de que cada hipótesis quede entre las `k` mejores según `by`.
+
+    Cada puntaje de `reach`, `impact`, `confidence` y `effort` se trata como
+    una normal centrada en el valor estimado con desviación `spread` (un
+    número, un dict por columna o un arreglo con la forma de la tabla),
+    acotada a la escala de 1 a 10. Las simulaciones se hacen en bloques de a
+    lo sumo `max_cells` valores por columna, así la memoria no depende de
+    `n_sims`; con `workers` distinto de 1 los bloques se reparten en un pool de
+    procesos.
+    """
+    weights = {'ICE': ICE_WEIGHTS, 'RICE': RICE_WEIGHTS, **(weights or {})}[by]
+    points = hypotheses[SCORE_COLUMNS].to_numpy(dtype=np.float64)
+    # con `k` mayor o igual que el número de hipótesis todas quedan siempre entre las mejores
+    top = min(k, points.shape[0])
+    if isinstance(spread, dict):
+        spread = np.array([spread.get(column, 0.0) for column in SCORE_COLUMNS])
+    spreads = np.broadcast_to(np.asarray(spread, dtype=np.float64), points.shape)
+
+    chunk = max(1, max_cells // points.shape[0])
+    tasks = [(points, spreads, weights, top, size, chunk_seed)
+             for size, chunk_seed in seeded_chunks(n_sims, chunk, seed)]
+    counts = sum(run_tasks(_simulate_top_k, tasks, workers))
+
+    point_scores = weighted_score(*points.T, weights)
+    return pd.DataFrame({
+        'hypothesis': hypotheses['hypothesis'].to_numpy() if 'hypothesis' in hypotheses.columns else hypotheses.index,
+        by: point_scores,
+        f'top_{k}_probability': counts / n_sims,
+    }, index=hypotheses.index).sort_values(by=f'top_{k}_probability', ascending=False)
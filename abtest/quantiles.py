@@ -0,0 +1,105 @@
+"""Sketch de cuantiles KLL: aproximado, combinable y alimentado por bloques.
+
+El sketch guarda a lo sumo unos `3 * k` valores sin importar cuántos datos
+recibe. El error de rango normalizado (la diferencia entre el rango real del
+valor devuelto y el cuantil pedido) es de aproximadamente `2.3 / k**0.97`
+con 99 % de confianza, alrededor de 1.3 % para `k=200` y 0.3 % para
+`k=1000`. Los cuantiles no se interpolan: se devuelve el menor valor
+guardado cuyo rango acumulado alcanza el cuantil pedido, como
+`np.percentile(..., method='inverted_cdf')`. Mientras se hayan agregado menos
+de `k` valores el resultado es igual al de ese método (no al de
+`np.percentile` por defecto, que interpola).
+"""
+
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """Sketch KLL de una columna numérica.
+
+    Los valores del nivel `h` representan `2**h` datos cada uno. Cuando un
+    nivel excede su capacidad se ordena y se promueve uno de cada dos valores
+    (con desplazamiento aleatorio) al nivel siguiente.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        """Agrega un bloque de valores; devuelve el mismo sketch."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Combina otro sketch en éste; devuelve el mismo sketch."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        while sum(values.size for values in self.levels) > sum(map(self._capacity, range(len(self.levels)))):
+            for level, values in enumerate(self.levels):
+                if values.size > self._capacity(level):
+                    break
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            values = np.sort(values)
+            # con un número impar de valores, uno se queda en el nivel actual
+            keep, values = values[:values.size % 2], values[values.size % 2:]
+            promoted = values[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def quantile(self, q):
+        """Cuantil(es) aproximado(s) para `q` en [0, 1], sin interpolar (inverted CDF)."""
+        if not self.n:
+            raise ValueError('el sketch está vacío')
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** h, dtype=np.float64) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        return values[np.clip(positions, 0, values.size - 1)]
+
+    def percentile(self, p):
+        """Como `np.percentile(..., method='inverted_cdf')`, con `p` en [0, 100]."""
+        return self.quantile(np.asarray(p) / 100)
+
+
+def sketch_by(frame, column, keys, k=200, seed=None, sketches=None):
+    """Un sketch de `column` por cada combinación de `keys` (por ejemplo grupo y fecha).
+
+    Si se pasa `sketches`, los bloques nuevos se agregan a los existentes, de
+    modo que la función puede llamarse con cada bloque leído.
+    """
+    sketches = {} if sketches is None else sketches
+    for key, values in frame.groupby(keys, observed=True, sort=False)[column]:
+        if key not in sketches:
+            sketches[key] = QuantileSketch(k=k, seed=seed)
+        sketches[key].update(values.to_numpy())
+    return sketches
+
+
+def merge_sketches(sketches, k=200, seed=None):
+    """Combina varios sketches (por ejemplo los de todos los días de un grupo)."""
+    merged = QuantileSketch(k=k, seed=seed)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
@@ -0,0 +1,43 @@
+"""Índice de rangos para repetir pruebas de Mann-Whitney sobre subconjuntos de la misma muestra."""
+
+import numpy as np
+
+from abtest.significance import histogram_mean, mannwhitneyu_counts
+
+
+class RankIndex:
+    """Ordena una sola vez los valores combinados de todos los grupos.
+
+    Cada elemento guarda el código de su grupo de empate (la posición de su
+    valor entre los valores distintos ordenados). Una prueba sobre cualquier
+    subconjunto, dado como máscara booleana alineada con `values` (la muestra
+    filtrada sin usuarios anómalos, una ventana de fechas, etc.), sólo cuenta
+    los códigos con `np.bincount` y calcula las sumas de rangos a partir de
+    esos conteos, sin volver a ordenar.
+    """
+
+    def __init__(self, values, groups):
+        self.values, self.codes = np.unique(np.asarray(values), return_inverse=True)
+        self.codes = self.codes.reshape(-1)
+        self.groups = np.asarray(groups)
+        if self.groups.shape != self.codes.shape:
+            raise ValueError('values y groups deben tener el mismo largo')
+
+    def __len__(self):
+        return self.codes.size
+
+    def counts(self, group, mask=None):
+        """Conteo por valor distinto de los elementos de `group` (dentro de `mask`)."""
+        selected = self.groups == group
+        if mask is not None:
+            selected &= np.asarray(mask, dtype=bool)
+        return np.bincount(self.codes[selected], minlength=self.values.size)
+
+    def mean(self, group, mask=None):
+        """Media de los valores de `group` (dentro de `mask`)."""
+        return histogram_mean(self.values, self.counts(group, mask))
+
+    def test(self, group_x, group_y, mask=None, use_continuity=True, alternative='two-sided'):
+        """Mann-Whitney de `group_x` contra `group_y`, igual que `stats.mannwhitneyu` sobre los elementos de `mask`."""
+        return mannwhitneyu_counts(self.values, self.counts(group_x, mask), self.counts(group_y, mask),
+                                   use_continuity, alternative)
@@ -0,0 +1,257 @@
+"""Reporte por lotes sin pantalla: se calculan todas las series y luego se dibujan los gráficos en paralelo.
+
+Uso:
+
+    python -m abtest.report --datasets files/datasets --output report
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from abtest.anomalies import AnomalyFilter, order_count_percentile, revenue_percentile
+from abtest.cache import load_cleaned
+from abtest.charts import line_chart, render, scatter_chart
+from abtest.cumulative import cumulative_metrics
+from abtest.incremental import merge_groups
+from abtest.instrument import PROFILERS, Instrument
+from abtest.parallel import run_tasks
+from abtest.prioritization import Prioritizer
+from abtest.quantiles import QuantileSketch
+from abtest.sequential import sequential_test
+from abtest.timeseries import significance_series
+from abtest.users import UserOrders
+from abtest.validation import validate
+from abtest.variants import VariantAnalysis
+
+
+ZERO_LINE = (0, {'color': 'black', 'linestyle': '--'})
+ALPHA_LINE = (0.05, {'color': 'red', 'linestyle': '--', 'label': 'alfa = 0.05'})
+
+
+def compute(datasets_dir='files/datasets', control='A', treatment='B', instrument=None):
+    """Calcula todas las tablas y series del análisis, sin dibujar nada.
+
+    Cada etapa se mide con `instrument` (un `Instrument`); por defecto se
+    configura con las variables de entorno `ABTEST_METRICS`/`ABTEST_PROFILE`.
+    """
+    instrument = instrument or Instrument.from_env()
+    with instrument.stage('load') as metrics:
+        hypotheses_us, orders_us, visits_us, common_visitors = load_cleaned(datasets_dir)
+        metrics['rows_out'] = len(orders_us)
+    # si los datos no son consistentes, DataQualityError detiene el reporte antes de las etapas costosas
+    with instrument.stage('validation', rows_in=len(orders_us)) as metrics:
+        quality = validate(orders_us, visits_us)
+        metrics['rows_out'] = len(quality.checks)
+    with instrument.stage('prioritization', rows_in=len(hypotheses_us)) as metrics:
+        prioritizer = Prioritizer(hypotheses_us)
+        ice, rice = prioritizer.top_k(3, by='ICE'), prioritizer.top_k(3, by='RICE')
+        metrics['rows_out'] = len(ice) + len(rice)
+
+    groups = (control, treatment)
+    with instrument.stage('cumulative', rows_in=len(orders_us)) as metrics:
+        cumulativeData = cumulative_metrics(orders_us, visits_us)
+        cumulativeData['conversion'] = cumulativeData['orders'] / cumulativeData['visitors']
+        metrics['rows_out'] = len(cumulativeData)
+
+    with instrument.stage('user_orders', rows_in=len(orders_us)) as metrics:
+        user_orders = UserOrders.from_orders(orders_us)
+        orders_sketch = QuantileSketch(seed=42).update(user_orders.table['orders'])
+        revenue_sketch = QuantileSketch(seed=42).update(orders_us['revenue'])
+        metrics['rows_out'] = len(user_orders)
+
+    with instrument.stage('anomalies', rows_in=len(user_orders)) as metrics:
+        anomalies = AnomalyFilter(user_orders, [order_count_percentile(95, orders_sketch),
+                                                revenue_percentile(95, revenue_sketch)])
+        metrics['rows_out'] = len(anomalies.abnormal_users)
+
+    with instrument.stage('mann_whitney', rows_in=len(orders_us)) as metrics:
+        variants = VariantAnalysis(orders_us, visits_us, control=control, users=user_orders)
+        results = variants.compare()
+        results_filtered = variants.compare(exclude=anomalies.order_mask)
+        metrics['rows_out'] = len(results) + len(results_filtered)
+
+    with instrument.stage('significance_series', rows_in=len(orders_us)) as metrics:
+        series = significance_series(variants)
+        metrics['rows_out'] = len(series)
+
+    with instrument.stage('sequential', rows_in=len(cumulativeData)) as metrics:
+        sequential = sequential_test(cumulativeData, control, treatment)
+        metrics['rows_out'] = len(sequential)
+
+    return {
+        'orders_us': orders_us,
+        'common_visitors': common_visitors,
+        'quality': quality,
+        'ice': ice,
+        'rice': rice,
+        'cumulativeData': cumulativeData,
+        'mergedCumulativeRevenue': merge_groups(cumulativeData, ['revenue', 'orders'], groups),
+        'mergedCumulativeConversions': merge_groups(cumulativeData, ['conversion'], groups),
+        'ordersByUsers': user_orders.orders_by_users(),
+        'orders_percentiles': orders_sketch.percentile([95, 99]),
+        'revenue_percentiles': revenue_sketch.percentile([95, 99]),
+        'abnormal_users': len(anomalies.abnormal_users),
+        'results': results,
+        'results_filtered': results_filtered,
+        'sequential': sequential,
+        'significance_series': series,
+        'groups': groups,
+    }
+
+
+def charts(analysis):
+    """Gráficos del notebook como `Chart` (sólo datos)."""
+    control, treatment = analysis['groups']
+    cumulativeData = analysis['cumulativeData']
+    by_group = {group: cumulativeData[cumulativeData['group'] == group] for group in (control, treatment)}
+    revenue = analysis['mergedCumulativeRevenue']
+    conversions = analysis['mergedCumulativeConversions']
+    orders_us = analysis['orders_us']
+    ordersByUsers = analysis['ordersByUsers']
+    average = {group: data['revenue'] / data['orders'] for group, data in by_group.items()}
+    series = analysis['significance_series']
+    series = series[(series['group_a'] == control) & (series['group_b'] == treatment)]
+
+    return [
+        line_chart('ingresos_acumulados', f'Gráfico de Ingresos para los Grupos {control} y {treatment}',
+                   'Fecha', 'Ingresos',
+                   [(group, data['date'], data['revenue']) for group, data in by_group.items()]),
+        line_chart('pedido_promedio_acumulado',
+                   f'Gráfico del Tamaño Promedio Acumulado de Compra para los Grupos {control} y {treatment}',
+                   'Fecha', 'Tamaño de Pedido Promedio',
+                   [(group, by_group[group]['date'], average[group]) for group in by_group]),
+        line_chart('diferencia_pedido_promedio', 'Gráfico de Diferencia Relativa para los Tamaños de Compra Promedio',
+                   'Fecha', 'Diferencia Relativa',
+                   [('', revenue['date'],
+                     (revenue['revenue' + treatment] / revenue['orders' + treatment])
+                     / (revenue['revenue' + control] / revenue['orders' + control]) - 1)],
+                   hlines=[ZERO_LINE]),
+        line_chart('conversion_acumulada', f'Gráfico de Conversión Acumulada para los Grupos {control} y {treatment}',
+                   'Fecha', 'Conversión',
+                   [(group, data['date'], data['conversion']) for group, data in by_group.items()]),
+        line_chart('diferencia_conversion', 'Gráfico de Diferencia Relativa para las Tasas de Conversión Acumuladas',
+                   'Fecha', 'Tasas de Conversión',
+                   [('', conversions['date'],
+                     conversions['conversion' + treatment] / conversions['conversion' + control] - 1)],
+                   hlines=[ZERO_LINE]),
+        line_chart('valor_p_diario', f'Valor p de las pruebas de Mann-Whitney hasta cada día ({control} vs {treatment})',
+                   'Fecha', 'Valor p',
+                   [('Conversión', series['date'], series['conversion_p_value']),
+                    ('Tamaño promedio de pedido', series['date'], series['revenue_p_value'])],
+                   hlines=[ALPHA_LINE]),
+        scatter_chart('pedidos_por_usuario', 'Número de pedidos por usuario', 'Usuario', 'Pedidos',
+                      [('', np.arange(len(ordersByUsers)), ordersByUsers['orders'])],
+                      percentiles=dict(zip([95, 99], analysis['orders_percentiles'])), seed=42),
+        scatter_chart('precios_pedidos', 'Precios de los pedidos', 'Pedido', 'Ingresos',
+                      [('', np.arange(len(orders_us)), orders_us['revenue'])],
+                      percentiles=dict(zip([95, 99], analysis['revenue_percentiles'])), seed=42),
+    ]
+
+
+def render_all(chart_list, output_dir, image_format='png', workers=None):
+    """Dibuja todos los gráficos en un pool de procesos y devuelve las rutas."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f'{chart.name}.{image_format}') for chart in chart_list]
+    return run_tasks(render, list(zip(chart_list, paths)), workers)
+
+
+def _markdown_table(frame, float_format='{:.5f}'):
+    def cell(value):
+        if isinstance(value, (float, np.floating)):
+            return float_format.format(value)
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        return str(value)
+
+    lines = ['| ' + ' | '.join(map(str, frame.columns)) + ' |', '|' + ' --- |' * len(frame.columns)]
+    lines += ['| ' + ' | '.join(cell(value) for value in row) + ' |' for row in frame.itertuples(index=False)]
+    return '\n'.join(lines)
+
+
+def write_report(analysis, image_paths, output_dir):
+    """Escribe `report.md` y `report.html` con las tablas y los gráficos."""
+    images = [os.path.relpath(path, output_dir) for path in image_paths]
+    sections = [
+        ('Validación de los datos', analysis['quality'].to_frame()),
+        ('Hipótesis más prometedoras con ICE', analysis['ice'][['hypothesis', 'ICE']]),
+        ('Hipótesis más prometedoras con RICE', analysis['rice'][['hypothesis', 'RICE']]),
+        ('Significancia con los datos en bruto', analysis['results']),
+        (f"Significancia con los datos filtrados ({analysis['abnormal_users']} usuarios anómalos)",
+         analysis['results_filtered']),
+        ('Prueba secuencial de la conversión (últimos días)', analysis['sequential'].tail()),
+        ('Valor p y diferencia relativa hasta cada día (últimos días)', analysis['significance_series'].tail()),
+    ]
+    summary = [
+        f"Usuarios en más de un grupo (eliminados): {len(analysis['common_visitors'])}",
+        f"Percentiles 95 y 99 de pedidos por usuario: {analysis['orders_percentiles']}",
+        f"Percentiles 95 y 99 de ingresos por pedido: {analysis['revenue_percentiles']}",
+    ]
+
+    markdown = ['# Departamento de marketing - Test A/B', '']
+    markdown += [f'* {line}' for line in summary] + ['']
+    for title, frame in sections:
+        markdown += [f'## {title}', '', _markdown_table(frame), '']
+    markdown += ['## Gráficos', ''] + [f'![{os.path.splitext(image)[0]}]({image})' for image in images]
+    with open(os.path.join(output_dir, 'report.md'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(markdown) + '\n')
+
+    html = ['<html><head><meta charset="utf-8"><title>Test A/B</title></head><body>',
+            '<h1>Departamento de marketing - Test A/B</h1>', '<ul>']
+    html += [f'<li>{line}</li>' for line in summary] + ['</ul>']
+    for title, frame in sections:
+        html += [f'<h2>{title}</h2>', frame.to_html(index=False, float_format=lambda value: f'{value:.5f}')]
+    html += ['<h2>Gráficos</h2>'] + [f'<img src="{image}">' for image in images] + ['</body></html>']
+    with open(os.path.join(output_dir, 'report.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(html) + '\n')
+
+
+def build_report(datasets_dir='files/datasets', output_dir='report', image_format='png', workers=None,
+                 control='A', treatment='B', instrument=None):
+    """Calcula el análisis, dibuja los gráficos en paralelo y escribe el reporte."""
+    instrument = instrument or Instrument.from_env()
+    analysis = compute(datasets_dir, control, treatment, instrument)
+    chart_list = charts(analysis)
+    with instrument.stage('render', rows_in=len(chart_list)) as metrics:
+        image_paths = render_all(chart_list, output_dir, image_format, workers)
+        metrics['rows_out'] = len(image_paths)
+    with instrument.stage('write_report'):
+        write_report(analysis, image_paths, output_dir)
+    return os.path.join(output_dir, 'report.md')
+
+
+def add_arguments(parser):
+    """Opciones del reporte; se comparten con el subcomando `report` de `python -m abtest`."""
+    parser.add_argument('--datasets', default='files/datasets', help='carpeta con los CSV')
+    parser.add_argument('--output', default='report', help='carpeta de salida')
+    parser.add_argument('--format', default='png', choices=['png', 'svg'], help='formato de los gráficos')
+    parser.add_argument('--workers', type=int, default=None, help='procesos para dibujar los gráficos')
+    parser.add_argument('--control', default='A')
+    parser.add_argument('--treatment', default='B')
+    parser.add_argument('--metrics', help='archivo JSON lines con las métricas de cada etapa (- para stderr)')
+    parser.add_argument('--profile', nargs='+', default=[], choices=PROFILERS,
+                        help='perfiles por etapa: cprofile y/o tracemalloc')
+    parser.add_argument('--profile-dir', help='carpeta para los .prof de cProfile de cada etapa')
+
+
+def run(args):
+    """Genera el reporte con las opciones de `add_arguments` e imprime la ruta de `report.md`."""
+    instrument = Instrument.from_env(profile_dir=args.profile_dir)
+    if args.metrics:
+        instrument.sink = sys.stderr if args.metrics == '-' else args.metrics
+    if args.profile:
+        instrument.profile = frozenset(args.profile)
+    print(build_report(args.datasets, args.output, args.format, args.workers, args.control, args.treatment,
+                       instrument))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera el reporte del test A/B sin pantalla.')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Resultados del test A/B por segmento (dispositivo, región, canal, día de la semana).
+
+`segment_cube` agrega pedidos, compradores, ingresos y visitas por
+(segmento, grupo, fecha) con un groupby por columna de segmento, y de ese cubo
+salen las series acumuladas de cada segmento. `segment_tests` repite las
+pruebas de Mann-Whitney y los intervalos bootstrap en cada valor de cada
+segmento en un pool de procesos y corrige los valores p por comparaciones
+múltiples.
+"""
+
+import numpy as np
+import pandas as pd
+
+from abtest.bootstrap import lift_interval
+from abtest.cumulative import CUMULATIVE_COLUMNS, cumulative_from_daily, daily_order_totals, daily_visit_totals
+from abtest.parallel import run_tasks
+from abtest.significance import adjust_p_values, histogram_mean, mannwhitneyu_hist
+from abtest.variants import VariantAnalysis
+
+
+SEGMENTS = ('device', 'region', 'channel', 'weekday')
+WEEKDAYS = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+CUBE_COLUMNS = ['segment', 'value', 'group', 'date', 'orders', 'buyers', 'revenue', 'visits']
+SEGMENT_RESULT_COLUMNS = ['segment', 'value', 'group_a', 'group_b', 'orders',
+                          'conversion_p_value', 'conversion_lift', 'conversion_low', 'conversion_high',
+                          'revenue_p_value', 'revenue_lift', 'revenue_low', 'revenue_high',
+                          'conversion_p_adjusted', 'revenue_p_adjusted']
+
+
+def with_weekday(frame):
+    """Agrega la columna `weekday` (nombre del día en español) a partir de `date`."""
+    return frame.assign(weekday=pd.Categorical.from_codes(frame['date'].dt.dayofweek, WEEKDAYS))
+
+
+def available_segments(orders_us, visits_us, candidates=SEGMENTS):
+    """Segmentos de `candidates` presentes en `orders_us`; `weekday` siempre se puede derivar de la fecha.
+
+    Un segmento que no está también en `visits_us` sólo tiene pruebas de
+    tamaño de pedido, porque no se conocen sus visitas.
+    """
+    return [segment for segment in candidates if segment == 'weekday' or segment in orders_us.columns]
+
+
+def _prepare(orders_us, visits_us, segments):
+    if 'weekday' in segments:
+        orders_us = orders_us if 'weekday' in orders_us.columns else with_weekday(orders_us)
+        visits_us = visits_us if 'weekday' in visits_us.columns else with_weekday(visits_us)
+    return orders_us, visits_us
+
+
+def segment_cube(orders_us, visits_us, segments=None):
+    """Totales diarios por (segmento, valor, grupo, fecha) con las columnas `CUBE_COLUMNS`.
+
+    `visits` es NaN para los segmentos que no están en `visits_us`.
+    """
+    segments = available_segments(orders_us, visits_us) if segments is None else list(segments)
+    orders_us, visits_us = _prepare(orders_us, visits_us, segments)
+    parts = []
+    for segment in segments:
+        daily = daily_order_totals(orders_us, [segment])
+        if segment in visits_us.columns:
+            daily = daily.join(daily_visit_totals(visits_us, [segment]), how='outer').fillna(0)
+        else:
+            daily['visits'] = np.nan
+        daily = daily.reset_index().rename(columns={segment: 'value'})
+        daily.insert(0, 'segment', segment)
+        parts.append(daily)
+    cube = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=CUBE_COLUMNS)
+    return cube[CUBE_COLUMNS]
+
+
+def segment_cumulative(cube):
+    """`cumulativeData` de cada valor de segmento a partir del cubo, sin volver a leer los pedidos.
+
+    Los segmentos sin visitas (no están en `visits_us`) no tienen serie acumulada.
+    """
+    parts = []
+    for segment, daily in cube.groupby('segment', sort=False):
+        if daily['visits'].isna().all():
+            continue
+        daily = daily.set_index(['value', 'group', 'date'])
+        cumulative = cumulative_from_daily(daily[['orders', 'buyers', 'revenue']], daily[['visits']], ['value'])
+        parts.append(cumulative.assign(segment=segment))
+    columns = ['segment', 'value'] + CUMULATIVE_COLUMNS
+    return pd.concat(parts, ignore_index=True)[columns] if parts else pd.DataFrame(columns=columns)
+
+
+def _segment_results(segment, value, orders_us, visits_us, control, n_boot, seed):
+    """Pruebas de un valor de segmento contra el control; sin visitas, sólo las de tamaño de pedido."""
+    has_visits = visits_us is not None
+    if not has_visits:
+        visits_us = pd.DataFrame({'date': orders_us['date'].iloc[:0], 'group': orders_us['group'].iloc[:0],
+                                  'visits': np.zeros(0, dtype=np.int64)})
+    ordered = set(pd.unique(orders_us['group']))
+    if control not in ordered:
+        return []
+    variants = VariantAnalysis(orders_us, visits_us, control=control)
+    treatments = [group for _, group in variants.pairs() if group in ordered]
+    # una semilla entera por intervalo, derivada de la semilla del segmento
+    seeds = [int(state) for state in seed.generate_state(2 * len(treatments))]
+
+    rows = []
+    for i, treatment in enumerate(treatments):
+        codes = variants.variants.index(control), variants.variants.index(treatment)
+
+        conversion = [np.nan] * 4
+        buyers = [(variants.user_codes == code).sum() for code in codes]
+        # sin visitas del segmento (o con menos visitas que compradores) no se puede medir la conversión
+        if has_visits and all(variants.visits[code] >= n for code, n in zip(codes, buyers)):
+            sample_a, sample_b = variants.conversion_sample(control), variants.conversion_sample(treatment)
+            conversion[:2] = [mannwhitneyu_hist(*sample_a, *sample_b).pvalue,
+                              histogram_mean(*sample_b) / histogram_mean(*sample_a) - 1]
+            if n_boot:
+                conversion[2:] = lift_interval(sample_a, sample_b, n_boot, seed=seeds[2 * i], workers=1)[1:]
+
+        revenue_a, revenue_b = variants.revenue_sample(control), variants.revenue_sample(treatment)
+        revenue = [variants.revenue_index.test(*codes).pvalue, revenue_b.mean() / revenue_a.mean() - 1,
+                   np.nan, np.nan]
+        if n_boot:
+            revenue[2:] = lift_interval(revenue_a, revenue_b, n_boot, seed=seeds[2 * i + 1], workers=1)[1:]
+        rows.append([segment, value, control, treatment, len(orders_us), *conversion, *revenue])
+    return rows
+
+
+def segment_tests(orders_us, visits_us, segments=None, control='A', n_boot=1_000, seed=None,
+                  correction='holm', workers=None):
+    """Pruebas de Mann-Whitney e intervalos bootstrap de cada valor de cada segmento contra `control`.
+
+    Los pedidos (y las visitas, si tienen el segmento) se separan con un
+    groupby por segmento y cada valor se evalúa en un proceso del pool
+    (`workers=1` los evalúa en el proceso actual). `n_boot=0` omite los
+    intervalos. Los valores p de cada métrica se corrigen juntos, todos los
+    segmentos y valores como una sola familia, con `correction` (`'holm'` o
+    `'fdr_bh'`, ver `significance.adjust_p_values`). Devuelve un DataFrame con
+    las columnas `SEGMENT_RESULT_COLUMNS`.
+    """
+    segments = available_segments(orders_us, visits_us) if segments is None else list(segments)
+    orders_us, visits_us = _prepare(orders_us, visits_us, segments)
+
+    tasks = []
+    for segment in segments:
+        visit_parts = (dict(iter(visits_us.groupby(segment, observed=True, sort=False)))
+                       if segment in visits_us.columns else {})
+        for value, orders_part in orders_us.groupby(segment, observed=True, sort=True):
+            visits_part = visit_parts.get(value) if segment in visits_us.columns else None
+            if segment in visits_us.columns and visits_part is None:
+                visits_part = visits_us.iloc[:0]
+            tasks.append((segment, value, orders_part.reset_index(drop=True), visits_part, control, n_boot))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    results = run_tasks(_segment_results, [task + (task_seed,) for task, task_seed in zip(tasks, seeds)], workers)
+
+    table = pd.DataFrame([row for rows in results for row in rows], columns=SEGMENT_RESULT_COLUMNS[:-2])
+    table['conversion_p_adjusted'] = adjust_p_values(table['conversion_p_value'], correction)
+    table['revenue_p_adjusted'] = adjust_p_values(table['revenue_p_value'], correction)
+    return table
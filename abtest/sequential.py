@@ -0,0 +1,64 @@
+"""Prueba secuencial (mSPRT) con valor p siempre válido sobre la serie acumulada diaria.
+
+Se usa el mSPRT con mezcla normal (Johari et al., "Always Valid Inference")
+sobre la diferencia de tasas de conversión `B - A`. El valor p puede
+consultarse cada día sin inflar el error tipo I, así que la prueba puede
+detenerse en cuanto cruza `alpha`.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+SequentialResult = namedtuple('SequentialResult', ('date', 'conversion_a', 'conversion_b', 'lift', 'p_value', 'decision'))
+
+
+class SequentialTest:
+    """Estado del mSPRT; cada día nuevo se procesa en O(1).
+
+    `tau` es la desviación estándar de la mezcla normal sobre la diferencia de
+    tasas: conviene que sea del orden del efecto que se espera detectar.
+    """
+
+    def __init__(self, alpha=0.05, tau=0.01):
+        self.alpha = alpha
+        self.tau2 = tau ** 2
+        self.p_value = 1.0
+        self.stopped = False
+
+    def update(self, date, trials_a, successes_a, trials_b, successes_b):
+        """Agrega los totales acumulados de un día y devuelve el valor p y la decisión."""
+        rate_a = successes_a / trials_a
+        rate_b = successes_b / trials_b
+        difference = rate_b - rate_a
+        # varianza de la diferencia de proporciones; las tasas se acotan a [0, 1]
+        bounded_a, bounded_b = min(rate_a, 1.0), min(rate_b, 1.0)
+        variance = bounded_a * (1 - bounded_a) / trials_a + bounded_b * (1 - bounded_b) / trials_b
+
+        if variance > 0:
+            log_likelihood_ratio = (0.5 * np.log(variance / (variance + self.tau2))
+                                    + self.tau2 * difference ** 2 / (2 * variance * (variance + self.tau2)))
+            self.p_value = min(self.p_value, float(np.exp(-log_likelihood_ratio)))
+
+        self.stopped = self.stopped or self.p_value <= self.alpha
+        lift = rate_b / rate_a - 1 if rate_a else np.nan
+        return SequentialResult(date, rate_a, rate_b, lift, self.p_value, 'stop' if self.stopped else 'continue')
+
+
+def sequential_test(cumulativeData, control='A', treatment='B', metric='orders', alpha=0.05, tau=0.01):
+    """Valor p siempre válido y decisión de parar/continuar para cada día de `cumulativeData`.
+
+    `metric` es la columna de éxitos: `'orders'` (la conversión del notebook,
+    pedidos / visitas) o `'buyers'` (compradores / visitas).
+    """
+    merged = cumulativeData[cumulativeData['group'] == control][['date', metric, 'visitors']].merge(
+        cumulativeData[cumulativeData['group'] == treatment][['date', metric, 'visitors']],
+        on='date', suffixes=['A', 'B'])
+
+    test = SequentialTest(alpha=alpha, tau=tau)
+    rows = [test.update(date, visitors_a, successes_a, visitors_b, successes_b)
+            for date, successes_a, visitors_a, successes_b, visitors_b
+            in merged[['date', metric + 'A', 'visitorsA', metric + 'B', 'visitorsB']].itertuples(index=False)]
+    return pd.DataFrame(rows, columns=SequentialResult._fields)
@@ -0,0 +1,132 @@
+"""Pruebas de significancia sobre histogramas de valores en lugar de muestras completas.
+
+scipy sólo se importa para la prueba exacta con muestras pequeñas; la
+aproximación normal usa `math.erfc`.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+
+MannWhitneyResult = namedtuple('MannWhitneyResult', ('statistic', 'pvalue'))
+
+
+def orders_histogram(orders, zeros):
+    """Histograma valor -> conteo del número de pedidos por visitante.
+
+    `orders` son los pedidos de los usuarios que compraron (por ejemplo
+    `ordersByUsersA['orders']`) y `zeros` el número de visitas sin pedido, que
+    se agregan como conteo del valor 0 sin crear la serie de ceros.
+    """
+    values, counts = np.unique(np.asarray(orders), return_counts=True)
+    zeros = int(zeros)
+    if zeros < 0:
+        raise ValueError('el número de visitas sin pedido no puede ser negativo')
+    if zeros:
+        if values.size and values[0] == 0:
+            counts[0] += zeros
+        else:
+            values = np.concatenate([[0], values])
+            counts = np.concatenate([[zeros], counts])
+    return values, counts
+
+
+def histogram_mean(values, counts):
+    """Media de una muestra dada como histograma."""
+    return float(np.dot(values, counts) / counts.sum())
+
+
+def mannwhitneyu_hist(values_x, counts_x, values_y, counts_y, use_continuity=True, alternative='two-sided'):
+    """Prueba de Mann-Whitney para dos muestras dadas como histogramas.
+
+    Devuelve el mismo estadístico U, corrección por empates y valor p que
+    `stats.mannwhitneyu` con `method='auto'` sobre las muestras expandidas,
+    pero en tiempo y memoria proporcionales al número de valores distintos.
+    """
+    values_x, counts_x = np.asarray(values_x), np.asarray(counts_x, dtype=np.int64)
+    values_y, counts_y = np.asarray(values_y), np.asarray(counts_y, dtype=np.int64)
+
+    # se unen los valores distintos de ambos grupos y se cuentan por valor
+    pooled, codes = np.unique(np.concatenate([values_x, values_y]), return_inverse=True)
+    pooled_x = np.bincount(codes[:values_x.size], weights=counts_x, minlength=pooled.size)
+    pooled_y = np.bincount(codes[values_x.size:], weights=counts_y, minlength=pooled.size)
+    return mannwhitneyu_counts(pooled, pooled_x, pooled_y, use_continuity, alternative)
+
+
+def mannwhitneyu_counts(values, counts_x, counts_y, use_continuity=True, alternative='two-sided'):
+    """Prueba de Mann-Whitney con conteos de ambos grupos sobre los mismos valores ordenados.
+
+    `values` son los valores distintos del conjunto combinado en orden
+    ascendente y `counts_x`/`counts_y` cuántas veces aparece cada uno en cada
+    grupo.
+    """
+    counts_x, counts_y = np.asarray(counts_x, dtype=np.float64), np.asarray(counts_y, dtype=np.float64)
+    n1, n2 = int(counts_x.sum()), int(counts_y.sum())
+    t = counts_x + counts_y
+
+    if (n1 <= 8 or n2 <= 8) and not np.any(t > 1):
+        # muestras pequeñas sin empates: scipy usa la distribución exacta
+        import scipy.stats as stats
+
+        return MannWhitneyResult(*stats.mannwhitneyu(
+            np.repeat(values, counts_x.astype(np.int64)), np.repeat(values, counts_y.astype(np.int64)),
+            use_continuity=use_continuity, alternative=alternative))
+
+    # rango promedio de cada valor distinto: los empates comparten el rango medio
+    midranks = np.cumsum(t) - (t - 1) / 2
+    R1 = np.dot(counts_x, midranks)
+    U1 = R1 - n1 * (n1 + 1) / 2
+    U2 = n1 * n2 - U1
+
+    if alternative == 'greater':
+        U, f = U1, 1
+    elif alternative == 'less':
+        U, f = U2, 1
+    elif alternative == 'two-sided':
+        U, f = max(U1, U2), 2
+    else:
+        raise ValueError("alternative debe ser 'two-sided', 'less' o 'greater'")
+
+    n = n1 + n2
+    tie_term = np.sum(t**3 - t)
+    s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    numerator = U - n1 * n2 / 2
+    if use_continuity:
+        numerator -= 0.5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = numerator / s
+    # función de distribución normal estándar en -z, igual que scipy.special.ndtr(-z)
+    p = float(np.clip(0.5 * math.erfc(z / math.sqrt(2)) * f, 0., 1.))
+    return MannWhitneyResult(float(U1), p)
+
+
+def adjust_p_values(p_values, method='holm'):
+    """Valores p corregidos por comparaciones múltiples.
+
+    `method='holm'` controla la probabilidad de algún falso positivo (Holm-
+    Bonferroni) y `method='fdr_bh'` la tasa de falsos descubrimientos
+    (Benjamini-Hochberg). Los NaN (pruebas que no se pudieron hacer) no
+    cuentan como comparaciones y se devuelven como NaN.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = ~np.isnan(p_values)
+    m = int(valid.sum())
+    if not m:
+        return adjusted
+
+    order = np.argsort(p_values[valid], kind='stable')
+    ranked = p_values[valid][order]
+    if method == 'holm':
+        ranked = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    elif method == 'fdr_bh':
+        ranked = np.minimum.accumulate((m / np.arange(1, m + 1) * ranked)[::-1])[::-1]
+    else:
+        raise ValueError("method debe ser 'holm' o 'fdr_bh'")
+
+    result = np.empty(m)
+    result[order] = np.minimum(ranked, 1.)
+    adjusted[valid] = result
+    return adjusted
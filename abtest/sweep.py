@@ -0,0 +1,134 @@
+"""Barrido de sensibilidad sobre los límites de usuarios anómalos."""
+
+import numpy as np
+import pandas as pd
+
+from abtest.parallel import run_tasks
+from abtest.significance import mannwhitneyu_counts
+
+
+SWEEP_COLUMNS = ['order_cap', 'revenue_cap', 'abnormal_users', 'conversion_p_value', 'conversion_lift',
+                 'revenue_p_value', 'revenue_lift']
+
+# datos compartidos por los procesos del pool, se asignan en `_init_worker`
+_shared = {}
+
+
+def _init_worker(shared):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def _prepare(variants, group_a, group_b):
+    """Arreglos que se reutilizan en todos los puntos de la malla."""
+    table = variants.users.table
+    user_code = pd.Categorical(table['group'], categories=variants.variants).codes
+    code_a, code_b = variants.variants.index(group_a), variants.variants.index(group_b)
+    in_pair = (user_code == code_a) | (user_code == code_b)
+
+    user_max = table['max_revenue'].to_numpy()
+    order_user = variants.user_of_order
+    order_rows = np.flatnonzero(in_pair[order_user])
+    order_user = order_user[order_rows]
+
+    # los ingresos se ordenan una sola vez en el índice de rangos; cada pedido guarda la posición de su valor
+    revenue_index = variants.revenue_index
+    revenue_codes = revenue_index.codes[order_rows]
+
+    # usuarios y pedidos ordenados por el pedido más caro del usuario: al subir el límite de
+    # ingresos entran los siguientes de la lista
+    users = np.flatnonzero(in_pair)
+    users = users[np.argsort(user_max[users], kind='stable')]
+    orders = np.argsort(user_max[order_user], kind='stable')
+
+    return {
+        'is_a_user': user_code == code_a,
+        'user_orders': table['orders'].to_numpy().astype(np.int64),
+        'user_max': user_max,
+        'users': users,
+        'order_user': order_user[orders],
+        'order_revenue_code': revenue_codes[orders],
+        'revenue_values': revenue_index.values,
+        'zeros_a': int(variants.visits[code_a] - (user_code == code_a).sum()),
+        'zeros_b': int(variants.visits[code_b] - (user_code == code_b).sum()),
+    }
+
+
+def _sweep_order_cap(order_cap, revenue_caps):
+    """Evalúa todos los límites de ingresos de un límite de pedidos, de menor a mayor.
+
+    Al subir el límite de ingresos sólo se agregan los usuarios y pedidos
+    nuevos a los conteos por valor, sin volver a ordenar ni a filtrar.
+    """
+    data = _shared
+    user_orders, user_max, is_a_user = data['user_orders'], data['user_max'], data['is_a_user']
+    ok_user = user_orders <= order_cap
+
+    users = data['users'][ok_user[data['users']]]
+    users_max = user_max[users]
+    keep_orders = ok_user[data['order_user']]
+    order_user = data['order_user'][keep_orders]
+    order_code = data['order_revenue_code'][keep_orders]
+    orders_max = user_max[order_user]
+
+    n_values = int(user_orders.max(initial=0)) + 1
+    conversion_values = np.arange(n_values)
+    conversion_a, conversion_b = np.zeros(n_values), np.zeros(n_values)
+    conversion_a[0], conversion_b[0] = data['zeros_a'], data['zeros_b']
+    revenue_a = np.zeros(data['revenue_values'].size)
+    revenue_b = np.zeros(data['revenue_values'].size)
+    total_users = data['users'].size
+
+    rows = []
+    user_pos = order_pos = 0
+    for revenue_cap in revenue_caps:
+        user_end = np.searchsorted(users_max, revenue_cap, side='right')
+        new_users = users[user_pos:user_end]
+        new_a = is_a_user[new_users]
+        conversion_a += np.bincount(user_orders[new_users[new_a]], minlength=n_values)
+        conversion_b += np.bincount(user_orders[new_users[~new_a]], minlength=n_values)
+        user_pos = user_end
+
+        order_end = np.searchsorted(orders_max, revenue_cap, side='right')
+        new_a = is_a_user[order_user[order_pos:order_end]]
+        new_codes = order_code[order_pos:order_end]
+        revenue_a += np.bincount(new_codes[new_a], minlength=revenue_a.size)
+        revenue_b += np.bincount(new_codes[~new_a], minlength=revenue_b.size)
+        order_pos = order_end
+
+        conversion_mean_a = conversion_values @ conversion_a / conversion_a.sum()
+        conversion_mean_b = conversion_values @ conversion_b / conversion_b.sum()
+        revenue_mean_a = data['revenue_values'] @ revenue_a / revenue_a.sum()
+        revenue_mean_b = data['revenue_values'] @ revenue_b / revenue_b.sum()
+        rows.append([
+            order_cap, revenue_cap, total_users - user_pos,
+            mannwhitneyu_counts(conversion_values, conversion_a, conversion_b).pvalue,
+            conversion_mean_b / conversion_mean_a - 1,
+            mannwhitneyu_counts(data['revenue_values'], revenue_a, revenue_b).pvalue,
+            revenue_mean_b / revenue_mean_a - 1,
+        ])
+    return rows
+
+
+def threshold_sweep(variants, grid, group_a=None, group_b=None, workers=None):
+    """Pruebas filtradas para cada pareja (límite de pedidos, límite de ingresos) de `grid`.
+
+    Un usuario es anómalo si hizo más pedidos que el límite de pedidos o
+    algún pedido de más que el límite de ingresos, como en las secciones
+    3.9 y 3.10. `variants` es un `VariantAnalysis`; por defecto se compara la
+    primera variante distinta del control contra el control. Cada límite de
+    pedidos se evalúa en un proceso del pool y sus límites de ingresos se
+    recorren de menor a mayor actualizando los conteos.
+    """
+    group_a = variants.control if group_a is None else group_a
+    group_b = variants.pairs()[0][1] if group_b is None else group_b
+    grid = pd.DataFrame(list(grid), columns=['order_cap', 'revenue_cap'])
+
+    tasks = [(order_cap, np.sort(caps['revenue_cap'].unique()))
+             for order_cap, caps in grid.groupby('order_cap', sort=True)]
+    shared = _prepare(variants, group_a, group_b)
+
+    results = run_tasks(_sweep_order_cap, tasks, workers, initializer=_init_worker, initargs=(shared,))
+
+    table = pd.DataFrame([row for rows in results for row in rows], columns=SWEEP_COLUMNS)
+    return grid.merge(table, on=['order_cap', 'revenue_cap'], how='left')
@@ -0,0 +1,119 @@
+"""Serie de tiempo de significancia: las pruebas de las secciones 3.7 y 3.8 día por día.
+
+En lugar de repetir la prueba completa para cada día, el estado se actualiza
+con los pedidos del día: pedidos acumulados por usuario, histograma de
+usuarios por número de pedidos e histograma de ingresos sobre los códigos de
+`VariantAnalysis.revenue_index` (ordenados una sola vez). Con una ventana
+móvil, los pedidos del día que sale de la ventana se restan del estado.
+"""
+
+import numpy as np
+import pandas as pd
+
+from abtest.significance import histogram_mean, mannwhitneyu_counts
+from abtest.variants import COMPARISON_COLUMNS
+
+
+SERIES_COLUMNS = ['date'] + COMPARISON_COLUMNS
+
+
+def _test(values, counts_a, counts_b):
+    """Valor p y diferencia relativa de b respecto de a; NaN si algún grupo está vacío."""
+    if counts_a.sum() == 0 or counts_b.sum() == 0:
+        return np.nan, np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = histogram_mean(values, counts_b) / histogram_mean(values, counts_a) - 1
+    return mannwhitneyu_counts(values, counts_a, counts_b).pvalue, lift
+
+
+class _WindowState:
+    """Conteos por grupo de los pedidos dentro del prefijo o la ventana actual."""
+
+    def __init__(self, n_groups, n_users, max_orders, n_revenue_values):
+        self.n_groups = n_groups
+        self.user_count = np.zeros(n_users, dtype=np.int64)
+        self.buyers = np.zeros(n_groups, dtype=np.int64)
+        self.visits = np.zeros(n_groups, dtype=np.int64)
+        self.orders_hist = np.zeros((n_groups, max_orders + 1), dtype=np.int64)
+        self.revenue_hist = np.zeros((n_groups, n_revenue_values), dtype=np.int64)
+
+    def apply(self, users, user_group, user_kept, revenue_groups, revenue_codes, visits, sign):
+        """Suma (`sign=1`) o resta (`sign=-1`) los pedidos y visitas de un día."""
+        self.visits += sign * visits
+        np.add.at(self.revenue_hist, (revenue_groups, revenue_codes), sign)
+
+        users, new_orders = np.unique(users, return_counts=True)
+        old = self.user_count[users]
+        new = old + sign * new_orders
+        self.user_count[users] = new
+        groups = user_group[users]
+        self.buyers += np.bincount(groups, weights=(new > 0).astype(np.int64) - (old > 0),
+                                   minlength=self.n_groups).astype(np.int64)
+
+        # el histograma sólo incluye a los usuarios no excluidos; `buyers` los cuenta a todos
+        kept = user_kept[users]
+        np.add.at(self.orders_hist, (groups[kept & (old > 0)], old[kept & (old > 0)]), -1)
+        np.add.at(self.orders_hist, (groups[kept & (new > 0)], new[kept & (new > 0)]), 1)
+
+    def conversion_counts(self, group):
+        counts = self.orders_hist[group].copy()
+        # como en el notebook, las visitas sin pedido son las visitas menos todos los compradores;
+        # en una ventana corta puede haber más compradores que visitas registradas
+        counts[0] = max(self.visits[group] - self.buyers[group], 0)
+        return counts
+
+
+def significance_series(variants, window=None, mode='control', exclude=None):
+    """Pruebas de conversión y tamaño de pedido para cada día del test.
+
+    Con `window=None` cada fila usa todos los días hasta esa fecha (el mismo
+    prefijo que `cumulativeData`, y la última fila coincide con
+    `variants.compare()`); con `window=n`, sólo los últimos `n` días.
+    `variants` es un `VariantAnalysis`; `mode` y `exclude` tienen el mismo
+    significado que en `VariantAnalysis.compare`. Devuelve una fila por fecha
+    y pareja de grupos con las columnas `SERIES_COLUMNS`.
+    """
+    if window is not None and window < 1:
+        raise ValueError('window debe ser un número de días positivo')
+    orders_us, visits_us = variants.orders_us, variants.visits_us
+    index = variants.revenue_index
+    pairs = [(variants.variants.index(a), variants.variants.index(b), a, b) for a, b in variants.pairs(mode)]
+
+    dates = np.union1d(orders_us['date'].unique(), visits_us['date'].unique())
+    order_day = np.searchsorted(dates, orders_us['date'].to_numpy())
+    visit_day = np.searchsorted(dates, visits_us['date'].to_numpy())
+    visit_code = pd.Categorical(visits_us['group'], categories=variants.variants).codes
+    daily_visits = np.zeros((dates.size, len(variants.variants)), dtype=np.int64)
+    np.add.at(daily_visits, (visit_day, visit_code), visits_us['visits'].to_numpy().astype(np.int64))
+
+    # pedidos distintos por usuario como en `UserOrders`: cuenta sólo la primera aparición de cada transacción
+    user_of_order = variants.user_of_order
+    first = ~pd.DataFrame({'user': user_of_order, 'transaction': orders_us['transaction_id'].to_numpy(),
+                           'day': order_day}).sort_values('day', kind='stable').duplicated(['user', 'transaction'])
+    first = first.sort_index().to_numpy()
+    keep_order = np.ones(len(orders_us), dtype=bool) if exclude is None else ~np.asarray(exclude, dtype=bool)
+    excluded_users = variants.excluded_users(exclude)
+    user_kept = np.ones(len(variants.users), dtype=bool) if excluded_users is None else ~excluded_users
+
+    by_day = np.argsort(order_day, kind='stable')
+    bounds = np.searchsorted(order_day[by_day], np.arange(dates.size + 1))
+
+    def day(d):
+        rows = by_day[bounds[d]:bounds[d + 1]]
+        counted, revenue_rows = rows[first[rows]], rows[keep_order[rows]]
+        return (user_of_order[counted], variants.user_codes, user_kept,
+                variants.order_codes[revenue_rows], index.codes[revenue_rows], daily_visits[d])
+
+    state = _WindowState(len(variants.variants), len(variants.users),
+                         int(variants.user_orders.max(initial=0)), index.values.size)
+    conversion_values = np.arange(state.orders_hist.shape[1])
+    rows = []
+    for d in range(dates.size):
+        state.apply(*day(d), sign=1)
+        if window is not None and d >= window:
+            state.apply(*day(d - window), sign=-1)
+        for code_a, code_b, group_a, group_b in pairs:
+            rows.append([dates[d], group_a, group_b,
+                         *_test(conversion_values, state.conversion_counts(code_a), state.conversion_counts(code_b)),
+                         *_test(index.values, state.revenue_hist[code_a], state.revenue_hist[code_b])])
+    return pd.DataFrame(rows, columns=SERIES_COLUMNS)
@@ -0,0 +1,58 @@
+"""Tabla de pedidos por usuario compartida por todas las pruebas."""
+
+import numpy as np
+import pandas as pd
+
+
+USER_COLUMNS = ['visitor_id', 'group', 'orders', 'revenue', 'max_revenue', 'first_date', 'last_date']
+
+
+class UserOrders:
+    """Pedidos distintos, ingresos y primera/última fecha por (visitante, grupo).
+
+    Se calcula una sola vez con los reductores nativos de pandas y sirve para
+    los gráficos de dispersión, los percentiles, la detección de anomalías y
+    las muestras de conversión sin volver a agrupar `orders_us`. La tabla está
+    ordenada por `visitor_id` y `group`.
+    """
+
+    def __init__(self, table, user_of_order=None, orders_index=None):
+        self.table = table
+        # posición en `table` del usuario de cada pedido, para pasar máscaras de usuarios a pedidos
+        self.user_of_order = user_of_order
+        self.orders_index = orders_index
+
+    @classmethod
+    def from_orders(cls, orders_us):
+        grouped = orders_us.groupby(['visitor_id', 'group'], sort=True, observed=True)
+        table = grouped.agg(
+            orders=('transaction_id', 'nunique'),
+            revenue=('revenue', 'sum'),
+            max_revenue=('revenue', 'max'),
+            first_date=('date', 'min'),
+            last_date=('date', 'max'),
+        ).reset_index()
+        table['group'] = table['group'].astype('category')
+        table['orders'] = table['orders'].astype(np.uint32)
+        return cls(table[USER_COLUMNS], grouped.ngroup().to_numpy(), orders_us.index)
+
+    @classmethod
+    def from_frame(cls, users):
+        """Usa una tabla ya agregada, por ejemplo `loading.load_aggregates(...).users`."""
+        return cls(users.sort_values(by=['visitor_id', 'group']).reset_index(drop=True)[USER_COLUMNS])
+
+    def __len__(self):
+        return len(self.table)
+
+    def orders_by_users(self, group=None):
+        """Tabla `['user_id', 'orders']` de todos los usuarios o de un grupo."""
+        table = self.table if group is None else self.table[self.table['group'] == group]
+        ordersByUsers = table[['visitor_id', 'orders']].reset_index(drop=True)
+        ordersByUsers.columns = ['user_id', 'orders']
+        return ordersByUsers
+
+    def order_mask(self, user_mask):
+        """Convierte una máscara alineada con `table` en una alineada con `orders_us`."""
+        if self.user_of_order is None:
+            raise ValueError('la tabla no se construyó a partir de los pedidos')
+        return pd.Series(np.asarray(user_mask, dtype=bool)[self.user_of_order], index=self.orders_index)
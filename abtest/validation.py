@@ -0,0 +1,181 @@
+"""Validación de calidad de datos antes del análisis.
+
+`validate` revisa `orders_us` y `visits_us` ya limpios y devuelve un
+`ValidationReport`; si alguna revisión falla lanza `DataQualityError` con el
+reporte, antes de calcular las métricas acumuladas y las pruebas. Revisiones:
+
+- `sample_ratio`: prueba chi-cuadrado de las visitas totales por grupo contra
+  la proporción esperada (por defecto, la misma para todos los grupos).
+- `missing_days`: días con visitas en algún grupo pero no en otro.
+- `orders_outside_visits`: pedidos con fecha fuera del rango de visitas de su grupo.
+- `buyers_exceed_visits`: días y grupos con más compradores distintos que visitas.
+- `duplicate_transactions`: `transaction_id` repetidos.
+
+Cada revisión es una operación vectorizada (groupby, comparación o
+`duplicated`) sobre las tablas completas.
+"""
+
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+Check = namedtuple('Check', ('name', 'passed', 'count', 'details', 'examples'))
+
+# máximo de filas de ejemplo que se guardan por revisión
+MAX_EXAMPLES = 10
+
+
+class DataQualityError(ValueError):
+    """Los datos no pasaron la validación; `report` tiene el detalle de cada revisión."""
+
+    def __init__(self, report):
+        self.report = report
+        failed = ', '.join(check.name for check in report.failures)
+        super().__init__(f'los datos no pasaron la validación: {failed}\n{report}')
+
+
+class ValidationReport:
+    """Resultado de todas las revisiones, en el orden en que se hicieron."""
+
+    def __init__(self, checks):
+        self.checks = list(checks)
+
+    @property
+    def passed(self):
+        return all(check.passed for check in self.checks)
+
+    @property
+    def failures(self):
+        return [check for check in self.checks if not check.passed]
+
+    def to_frame(self):
+        """Una fila por revisión con `name`, `passed`, `count` y `details` (como texto)."""
+        return pd.DataFrame([(check.name, check.passed, check.count, _format_details(check.details))
+                             for check in self.checks], columns=Check._fields[:4])
+
+    def to_dict(self):
+        return {'passed': self.passed, 'checks': [check._asdict() for check in self.checks]}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), default=str, ensure_ascii=False)
+
+    def __str__(self):
+        lines = []
+        for check in self.checks:
+            status = 'ok' if check.passed else 'FALLA'
+            details = _format_details(check.details)
+            lines.append(f'[{status}] {check.name}: {check.count} ({details})' if details
+                         else f'[{status}] {check.name}: {check.count}')
+        return '\n'.join(lines)
+
+
+def _format_details(details):
+    return ', '.join(f'{key}={value}' for key, value in details.items())
+
+
+def _examples(frame):
+    return frame.head(MAX_EXAMPLES).to_dict(orient='records')
+
+
+def chi2_sf(statistic, df):
+    """P(X > statistic) para una chi-cuadrado con `df` grados de libertad enteros.
+
+    Usa la forma cerrada de la gamma incompleta regularizada para grados de
+    libertad enteros, así la validación no necesita importar scipy.
+    """
+    if df < 1:
+        return float('nan')
+    y = statistic / 2
+    if df % 2 == 0:
+        # Q(k, y) = exp(-y) * suma_{i<k} y^i / i!
+        term = total = 1.0
+        for i in range(1, df // 2):
+            term *= y / i
+            total += term
+        return float(min(math.exp(-y) * total, 1.0))
+    # Q(k + 1/2, y) = erfc(sqrt(y)) + exp(-y) * suma_{i<k} y^(i + 1/2) / Γ(i + 3/2)
+    term, total = math.sqrt(y) / math.gamma(1.5), 0.0
+    for i in range(df // 2):
+        total += term
+        term *= y / (i + 1.5)
+    return float(min(math.erfc(math.sqrt(y)) + math.exp(-y) * total, 1.0))
+
+
+def sample_ratio_check(visits_us, expected_ratio=None, alpha=0.001):
+    """Prueba chi-cuadrado de desbalance de muestra (SRM) sobre las visitas totales por grupo.
+
+    `expected_ratio` es un dict grupo -> peso (por defecto, iguales). Con
+    `alpha=0.001`, como es habitual para SRM, sólo falla ante desbalances que
+    difícilmente son azar.
+    """
+    totals = visits_us.groupby('group', observed=True)['visits'].sum()
+    weights = (np.ones(len(totals)) if expected_ratio is None
+               else np.array([expected_ratio[group] for group in totals.index], dtype=np.float64))
+    expected = totals.sum() * weights / weights.sum()
+    statistic = float(np.sum((totals.to_numpy() - expected) ** 2 / expected))
+    p_value = chi2_sf(statistic, len(totals) - 1)
+    details = {'p_value': float(p_value), 'chi2': float(statistic), 'alpha': alpha,
+               **{f'visits_{group}': int(total) for group, total in totals.items()}}
+    return Check('sample_ratio', bool(p_value >= alpha), int(len(totals)), details, [])
+
+
+def missing_days_check(visits_us):
+    """Días en los que algún grupo no tiene visitas registradas (o tiene 0) y otro sí."""
+    visits = visits_us.pivot_table(index='date', columns='group', values='visits', aggfunc='sum',
+                                   observed=True, fill_value=0)
+    missing = visits[(visits == 0).any(axis=1)]
+    rows = missing.reset_index().melt(id_vars='date', var_name='group', value_name='visits')
+    rows = rows[rows['visits'] == 0].sort_values(['date', 'group'])
+    return Check('missing_days', missing.empty, int(len(missing)), {'days': int(len(visits))},
+                 _examples(rows[['date', 'group']]))
+
+
+def orders_outside_visits_check(orders_us, visits_us):
+    """Pedidos con fecha fuera del rango de fechas de visitas de su grupo (o de un grupo sin visitas)."""
+    ranges = visits_us.groupby('group', observed=True)['date'].agg(['min', 'max'])
+    first = orders_us['group'].map(ranges['min']).astype('datetime64[ns]')
+    last = orders_us['group'].map(ranges['max']).astype('datetime64[ns]')
+    outside = ~((orders_us['date'] >= first) & (orders_us['date'] <= last)).to_numpy()
+    rows = orders_us.loc[outside, ['transaction_id', 'visitor_id', 'date', 'group']]
+    return Check('orders_outside_visits', not outside.any(), int(outside.sum()),
+                 {'first_visit': str(ranges['min'].min().date()), 'last_visit': str(ranges['max'].max().date())}, _examples(rows))
+
+
+def buyers_exceed_visits_check(orders_us, visits_us):
+    """Días y grupos con más compradores distintos que visitas."""
+    buyers = orders_us.groupby(['date', 'group'], observed=True)['visitor_id'].nunique().rename('buyers')
+    visits = visits_us.groupby(['date', 'group'], observed=True)['visits'].sum()
+    daily = buyers.to_frame().join(visits, how='left').fillna({'visits': 0})
+    rows = daily[daily['buyers'] > daily['visits']].reset_index()
+    return Check('buyers_exceed_visits', rows.empty, int(len(rows)), {'days_groups': int(len(daily))},
+                 _examples(rows))
+
+
+def duplicate_transactions_check(orders_us):
+    """`transaction_id` que aparecen en más de una fila."""
+    duplicated = orders_us.duplicated(subset='transaction_id', keep=False).to_numpy()
+    rows = orders_us.loc[duplicated].sort_values('transaction_id')
+    n_ids = int(rows['transaction_id'].nunique())
+    return Check('duplicate_transactions', n_ids == 0, n_ids, {'rows': int(duplicated.sum())},
+                 _examples(rows[['transaction_id', 'visitor_id', 'date', 'group', 'revenue']]))
+
+
+def validate(orders_us, visits_us, expected_ratio=None, srm_alpha=0.001, raise_on_failure=True):
+    """Ejecuta todas las revisiones y lanza `DataQualityError` si alguna falla.
+
+    Con `raise_on_failure=False` sólo devuelve el `ValidationReport`.
+    """
+    report = ValidationReport([
+        sample_ratio_check(visits_us, expected_ratio, srm_alpha),
+        missing_days_check(visits_us),
+        orders_outside_visits_check(orders_us, visits_us),
+        buyers_exceed_visits_check(orders_us, visits_us),
+        duplicate_transactions_check(orders_us),
+    ])
+    if raise_on_failure and not report.passed:
+        raise DataQualityError(report)
+    return report
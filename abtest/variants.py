@@ -0,0 +1,153 @@
+"""Análisis A/B/n: métricas y pruebas para cualquier número de variantes."""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from abtest.cumulative import cumulative_metrics
+from abtest.ranks import RankIndex
+from abtest.significance import histogram_mean, mannwhitneyu_hist, orders_histogram
+from abtest.users import UserOrders
+
+
+COMPARISON_COLUMNS = ['group_a', 'group_b', 'conversion_p_value', 'conversion_lift',
+                      'revenue_p_value', 'revenue_lift']
+
+
+class VariantAnalysis:
+    """Particiona `orders_us` y `visits_us` por grupo una sola vez.
+
+    Los pedidos se ordenan por el código de su grupo, de modo que cada
+    variante es un rango contiguo de los arreglos; los pedidos por usuario se
+    toman de `users` (una `UserOrders` ya calculada) o se obtienen con un
+    único groupby por (usuario, grupo). Con eso las pruebas de cada pareja de
+    variantes son sólo cortes de arreglos ya calculados.
+    """
+
+    def __init__(self, orders_us, visits_us, control=None, users=None):
+        self.orders_us = orders_us
+        self.visits_us = visits_us
+        self.variants = sorted(set(pd.unique(orders_us['group'])) | set(pd.unique(visits_us['group'])))
+        self.control = self.variants[0] if control is None else control
+        if self.control not in self.variants:
+            raise ValueError(f'el grupo de control {self.control!r} no está en los datos')
+
+        codes = pd.Categorical(orders_us['group'], categories=self.variants).codes
+        self._order = np.argsort(codes, kind='stable')
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(self.variants) + 1))
+        self._revenue = orders_us['revenue'].to_numpy()[self._order]
+        self._codes = codes
+        self._revenue_index = None
+
+        visit_codes = pd.Categorical(visits_us['group'], categories=self.variants).codes
+        self.visits = np.bincount(visit_codes, weights=visits_us['visits'].to_numpy(),
+                                  minlength=len(self.variants)).astype(np.int64)
+
+        self.users = UserOrders.from_orders(orders_us) if users is None else users
+        self._user_of_order = self.users.user_of_order
+        self._user_orders = self.users.table['orders'].to_numpy()
+        self._user_code = pd.Categorical(self.users.table['group'], categories=self.variants).codes
+
+    @property
+    def revenue_index(self):
+        """`RankIndex` de los ingresos de todos los pedidos, alineado con `orders_us`; se ordena una sola vez."""
+        if self._revenue_index is None:
+            self._revenue_index = RankIndex(self.orders_us['revenue'].to_numpy(), self._codes)
+        return self._revenue_index
+
+    @property
+    def user_of_order(self):
+        """Posición en `users.table` del usuario de cada pedido de `orders_us`.
+
+        Sólo existe si `users` se construyó a partir de los pedidos
+        (`UserOrders.from_orders`); con una tabla ya agregada
+        (`UserOrders.from_frame`) lanza `ValueError`.
+        """
+        if self._user_of_order is None:
+            raise ValueError('se necesitan usuarios construidos a partir de los pedidos '
+                             '(UserOrders.from_orders), no de una tabla ya agregada')
+        return self._user_of_order
+
+    @property
+    def order_codes(self):
+        """Código (posición en `variants`) del grupo de cada pedido de `orders_us`."""
+        return self._codes
+
+    @property
+    def user_codes(self):
+        """Código del grupo de cada fila de `users.table`."""
+        return self._user_code
+
+    @property
+    def user_orders(self):
+        """Pedidos distintos de cada fila de `users.table`."""
+        return self._user_orders
+
+    def cumulative(self):
+        """`cumulativeData` para todas las variantes a la vez."""
+        return cumulative_metrics(self.orders_us, self.visits_us)
+
+    def excluded_users(self, exclude):
+        """Máscara alineada con `users.table` de los usuarios con algún pedido marcado en `exclude`.
+
+        `exclude` es una máscara alineada con `orders_us`, o `None` (devuelve
+        `None`); necesita `user_of_order`.
+        """
+        if exclude is None:
+            return None
+        exclude = np.asarray(exclude, dtype=bool)
+        return np.bincount(self.user_of_order, weights=exclude, minlength=self._user_orders.size) > 0
+
+    def conversion_sample(self, variant, excluded_users=None):
+        """Histograma de pedidos por visitante de una variante, incluidas las visitas sin pedido.
+
+        Como en el notebook, las visitas sin pedido se cuentan respecto de
+        todos los compradores aunque algunos queden excluidos.
+        """
+        code = self.variants.index(variant)
+        in_variant = self._user_code == code
+        keep = in_variant if excluded_users is None else in_variant & ~excluded_users
+        return orders_histogram(self._user_orders[keep], self.visits[code] - in_variant.sum())
+
+    def revenue_sample(self, variant, exclude=None):
+        """Ingresos de los pedidos de una variante."""
+        code = self.variants.index(variant)
+        start, stop = self._bounds[code], self._bounds[code + 1]
+        revenue = self._revenue[start:stop]
+        if exclude is None:
+            return revenue
+        return revenue[~np.asarray(exclude, dtype=bool)[self._order[start:stop]]]
+
+    def pairs(self, mode='control'):
+        """Parejas a comparar: cada variante contra el control o todas contra todas."""
+        if mode == 'control':
+            return [(self.control, variant) for variant in self.variants if variant != self.control]
+        if mode == 'all':
+            return list(combinations(self.variants, 2))
+        raise ValueError("mode debe ser 'control' o 'all'")
+
+    def compare(self, mode='control', exclude=None):
+        """Pruebas de Mann-Whitney de conversión y tamaño de pedido para cada pareja.
+
+        `exclude` es una máscara booleana alineada con `orders_us` que marca
+        los pedidos de usuarios que se quitan (por ejemplo, anómalos). La
+        diferencia relativa es la de `group_b` respecto de `group_a`. La prueba
+        de ingresos usa `revenue_index`, así que las llamadas con distintas
+        máscaras no vuelven a ordenar los ingresos.
+        """
+        excluded_users = self.excluded_users(exclude)
+        conversion = {variant: self.conversion_sample(variant, excluded_users) for variant in self.variants}
+        revenue = {variant: self.revenue_sample(variant, exclude) for variant in self.variants}
+        keep = None if exclude is None else ~np.asarray(exclude, dtype=bool)
+
+        rows = []
+        for group_a, group_b in self.pairs(mode):
+            rows.append([
+                group_a, group_b,
+                mannwhitneyu_hist(*conversion[group_a], *conversion[group_b]).pvalue,
+                histogram_mean(*conversion[group_b]) / histogram_mean(*conversion[group_a]) - 1,
+                self.revenue_index.test(self.variants.index(group_a), self.variants.index(group_b), keep).pvalue,
+                revenue[group_b].mean() / revenue[group_a].mean() - 1,
+            ])
+        return pd.DataFrame(rows, columns=COMPARISON_COLUMNS)
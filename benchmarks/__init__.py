@@ -0,0 +1 @@
+"""Benchmarks del análisis A/B sobre datos sintéticos."""
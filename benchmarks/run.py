@@ -0,0 +1,179 @@
+"""Mide tiempo y memoria de cada etapa del análisis con datos sintéticos de distintos tamaños.
+
+Uso:
+
+    python -m benchmarks.run --sizes 1e3 1e4 1e5 1e6 --output benchmarks/results.json
+    python -m benchmarks.run --sizes 1e3 1e4 1e5 1e6 --baseline benchmarks/results.json
+
+Cada tamaño se mide en un proceso nuevo, así que la memoria de un tamaño no
+se mezcla con la de otro. Con `--baseline` se comparan los tiempos contra un JSON anterior
+y el proceso termina con código 1 si alguna etapa es más lenta que la
+tolerancia.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from abtest.anomalies import AnomalyFilter, order_count_percentile, revenue_percentile
+from abtest.cache import clean_datasets, read_sources
+from abtest.cumulative import cumulative_from_daily, cumulative_metrics
+from abtest.instrument import Instrument
+from abtest.loading import load_aggregates
+from abtest.quantiles import QuantileSketch
+from abtest.users import UserOrders
+from abtest.validation import validate
+from abtest.variants import VariantAnalysis
+from benchmarks.synthetic import SyntheticConfig, write_datasets
+
+
+# `stream_cumulative` va primero para que su memoria no incluya la de las tablas completas
+STAGES = ('stream_cumulative', 'load', 'contamination', 'validation', 'cumulative', 'user_orders', 'mann_whitney', 'anomalies')
+
+# por debajo de este tiempo las diferencias son ruido y no cuentan como regresión
+MIN_SECONDS = 0.05
+
+
+def _stages(datasets_dir):
+    """Etapas en orden; cada una recibe el estado acumulado y devuelve lo que agrega."""
+    def stream_cumulative(state):
+        aggregates = load_aggregates(os.path.join(datasets_dir, 'orders_us.csv'),
+                                     os.path.join(datasets_dir, 'visits_us.csv'), chunksize=100_000)
+        return {'rows': len(cumulative_from_daily(aggregates.daily_orders, aggregates.daily_visits))}
+
+    def load(state):
+        hypotheses_us, orders_us, visits_us = read_sources(datasets_dir)
+        return {'raw': (hypotheses_us, orders_us, visits_us), 'rows': len(orders_us)}
+
+    def contamination(state):
+        cleaned = clean_datasets(*state['raw'])
+        return {'orders_us': cleaned.orders_us, 'visits_us': cleaned.visits_us, 'raw': None,
+                'rows': len(cleaned.orders_us)}
+
+    def validation(state):
+        report = validate(state['orders_us'], state['visits_us'], raise_on_failure=False)
+        return {'rows': len(report.checks)}
+
+    def cumulative(state):
+        cumulativeData = cumulative_metrics(state['orders_us'], state['visits_us'])
+        return {'rows': len(cumulativeData)}
+
+    def user_orders(state):
+        users = UserOrders.from_orders(state['orders_us'])
+        return {'users': users, 'rows': len(users)}
+
+    def mann_whitney(state):
+        variants = VariantAnalysis(state['orders_us'], state['visits_us'], users=state['users'])
+        return {'variants': variants, 'rows': len(variants.compare())}
+
+    def anomalies(state):
+        users = state['users']
+        orders_sketch = QuantileSketch(seed=42).update(users.table['orders'])
+        revenue_sketch = QuantileSketch(seed=42).update(state['orders_us']['revenue'])
+        anomaly_filter = AnomalyFilter(users, [order_count_percentile(95, orders_sketch),
+                                               revenue_percentile(95, revenue_sketch)])
+        return {'rows': len(state['variants'].compare(exclude=anomaly_filter.order_mask))}
+
+    stages = locals()
+    return [(name, stages[name]) for name in STAGES]
+
+
+def run_size(n_orders, datasets_dir, trace_memory=True):
+    """Mide cada etapa sobre los datos sintéticos de `datasets_dir`."""
+    instrument = Instrument(profile=('tracemalloc',) if trace_memory else ())
+    state = {}
+    for name, stage in _stages(datasets_dir):
+        with instrument.stage(name, rows_in=state.get('rows')) as metrics:
+            state.update(stage(state))
+            metrics['rows_out'] = state['rows']
+    return [{'size': n_orders, **record} for record in instrument.records]
+
+
+def run(sizes, work_dir, seed=0, trace_memory=True):
+    """Genera los datos de cada tamaño y ejecuta `run_size` sobre ellos.
+
+    La generación y la medición corren en procesos distintos para que la
+    memoria del generador no cuente en la de las etapas.
+    """
+    results = []
+    for size in sizes:
+        datasets_dir = os.path.join(work_dir, str(size))
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(write_datasets, SyntheticConfig(size, seed=seed), datasets_dir).result()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.extend(executor.submit(run_size, size, datasets_dir, trace_memory).result())
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def regressions(current, baseline, tolerance=0.25):
+    """Etapas de `current` más lentas que en `baseline` por más de `tolerance` (fracción)."""
+    previous = {(row['size'], row['stage']): row['seconds'] for row in baseline['results']}
+    slower = []
+    for row in current['results']:
+        before = previous.get((row['size'], row['stage']))
+        if before is not None and row['seconds'] > MIN_SECONDS and row['seconds'] > before * (1 + tolerance):
+            slower.append({**row, 'baseline_seconds': before})
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6],
+                        help='número de pedidos sintéticos, de 1e3 a 1e8')
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--work-dir', help='directorio para los CSV sintéticos (por defecto uno temporal)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='no medir la memoria asignada por etapa (tracemalloc agrega algo de costo)')
+    parser.add_argument('--baseline', help='JSON de una ejecución anterior para detectar regresiones')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes]
+    if args.work_dir:
+        current = run(sizes, args.work_dir, args.seed, not args.no_tracemalloc)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            current = run(sizes, work_dir, args.seed, not args.no_tracemalloc)
+
+    for row in current['results']:
+        if 'rss_delta_mb' in row:
+            memory = f"{row['peak_rss_mb']:9.1f} MiB pico RSS {row['rss_delta_mb']:+9.1f} MiB"
+        else:
+            memory = f"{row['process_peak_rss_mb']:9.1f} MiB pico RSS del proceso"
+        print(f"{row['size']:>11,} {row['stage']:<14} {row['seconds']:9.3f} s {memory}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f'Resultados guardados en {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(current, json.load(f), args.tolerance)
+        for row in slower:
+            print(f"Regresión: {row['stage']} con {row['size']:,} pedidos tarda {row['seconds']:.3f} s "
+                  f"(antes {row['baseline_seconds']:.3f} s)")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Generador reproducible de datos sintéticos con el esquema de `files/datasets`.
+
+- `orders_us.csv`: transactionId, visitorId, date, revenue, group
+- `visits_us.csv`: date, group, visits
+- `hypotheses_us.csv` (separado por `;`): Hypothesis, Reach, Impact, Confidence, Effort
+
+Cada visitante pertenece a un grupo salvo una fracción `contamination` que
+aparece en varios, como en los datos reales. Los ingresos tienen cola pesada
+(Pareto). Los pedidos se generan por bloques, cada uno con su propia semilla
+derivada con `SeedSequence.spawn`: con la misma semilla y el mismo tamaño de
+bloque el resultado es idéntico, y se pueden escribir 10⁸ filas sin tenerlas
+en memoria.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+SyntheticConfig = namedtuple('SyntheticConfig', ('n_orders', 'n_days', 'groups', 'n_visitors', 'contamination',
+                                                 'visits_per_visitor', 'revenue_alpha', 'revenue_scale',
+                                                 'start', 'seed'))
+SyntheticConfig.__new__.__defaults__ = (31, ('A', 'B'), None, 0.05, 10.0, 1.5, 100.0, '2019-08-01', 0)
+
+# multiplicadores impares: la multiplicación módulo 2**32 es una biyección, así que los ids son únicos
+_VISITOR_MULTIPLIER = 2_654_435_761
+_TRANSACTION_MULTIPLIER = 2_246_822_519
+_ID_OFFSET = 10**8
+
+
+def _n_visitors(config):
+    return config.n_visitors or max(int(config.n_orders / 1.2), 1)
+
+
+def _scramble(index, multiplier):
+    return (index.astype(np.uint64) * np.uint64(multiplier)) % np.uint64(1 << 32) + np.uint64(_ID_OFFSET)
+
+
+def _orders_chunk(config, first, size, seed):
+    rng = np.random.default_rng(seed)
+    n_visitors, n_groups = _n_visitors(config), len(config.groups)
+    visitor = rng.integers(0, n_visitors, size)
+
+    # grupo fijo por visitante; los contaminados reciben un grupo al azar en cada pedido
+    group = (visitor * _VISITOR_MULTIPLIER >> 7) % n_groups
+    contaminated = rng.random(size) < config.contamination
+    group[contaminated] = rng.integers(0, n_groups, contaminated.sum())
+
+    dates = pd.Timestamp(config.start) + pd.to_timedelta(rng.integers(0, config.n_days, size), unit='D')
+    revenue = np.round((rng.pareto(config.revenue_alpha, size) + 0.05) * config.revenue_scale, 1)
+    return pd.DataFrame({
+        'transactionId': _scramble(np.arange(first, first + size), _TRANSACTION_MULTIPLIER),
+        'visitorId': _scramble(visitor, _VISITOR_MULTIPLIER),
+        'date': dates.strftime('%Y-%m-%d'),
+        'revenue': revenue,
+        'group': np.asarray(config.groups)[group],
+    })
+
+
+def iter_orders(config, chunksize=1_000_000):
+    """Genera `orders_us` por bloques de `chunksize` filas."""
+    n_chunks = -(-config.n_orders // chunksize)
+    seeds = np.random.SeedSequence(config.seed).spawn(n_chunks + 1)[1:]
+    for i, seed in enumerate(seeds):
+        first = i * chunksize
+        yield _orders_chunk(config, first, min(chunksize, config.n_orders - first), seed)
+
+
+def visits(config):
+    """Visitas por día y grupo, alrededor de `visits_per_visitor` por visitante en todo el periodo."""
+    rng = np.random.default_rng(np.random.SeedSequence(config.seed).spawn(1)[0])
+    dates = pd.date_range(config.start, periods=config.n_days)
+    mean = _n_visitors(config) * config.visits_per_visitor / (config.n_days * len(config.groups))
+    frame = pd.MultiIndex.from_product([dates.strftime('%Y-%m-%d'), config.groups], names=['date', 'group']).to_frame(index=False)
+    frame['visits'] = rng.poisson(mean, len(frame)) + 1
+    return frame
+
+
+def hypotheses(config, n=9):
+    """Lista de hipótesis con puntajes enteros entre 1 y 10."""
+    rng = np.random.default_rng(config.seed)
+    scores = rng.integers(1, 11, (n, 4))
+    return pd.DataFrame({'Hypothesis': [f'Hipótesis sintética {i}' for i in range(n)],
+                         'Reach': scores[:, 0], 'Impact': scores[:, 1],
+                         'Confidence': scores[:, 2], 'Effort': scores[:, 3]})
+
+
+def write_datasets(config, datasets_dir, chunksize=1_000_000):
+    """Escribe los tres CSV en `datasets_dir` y devuelve el directorio."""
+    os.makedirs(datasets_dir, exist_ok=True)
+    orders_path = os.path.join(datasets_dir, 'orders_us.csv')
+    for i, chunk in enumerate(iter_orders(config, chunksize)):
+        chunk.to_csv(orders_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    visits(config).to_csv(os.path.join(datasets_dir, 'visits_us.csv'), index=False)
+    hypotheses(config).to_csv(os.path.join(datasets_dir, 'hypotheses_us.csv'), sep=';', index=False)
+    return datasets_dir
@@ -63,16 +63,32 @@
 # %%
 # se cargan todas las librerías
 import pandas as pd
-import numpy as np
 from matplotlib import pyplot as plt
-import scipy.stats as stats
+
+from abtest.anomalies import AnomalyFilter, order_count_percentile, revenue_percentile
+from abtest.bootstrap import lift_interval
+from abtest.cache import load_cleaned
+from abtest.charts import draw, scatter_chart
+from abtest.cuped import cuped_compare, load_pre_period
+from abtest.cumulative import cumulative_metrics
+from abtest.prioritization import Prioritizer, top_k_probability
+from abtest.quantiles import QuantileSketch
+from abtest.segments import segment_tests
+from abtest.sequential import sequential_test
+from abtest.sweep import threshold_sweep
+from abtest.timeseries import significance_series
+from abtest.users import UserOrders
+from abtest.validation import validate
+from abtest.variants import VariantAnalysis
 
 # %%
 # se descargan los datos completos con los tipos de datos correctos
+# load_cleaned guarda los datos limpios en una caché Feather (files/datasets/cache) y sólo
+# vuelve a leer los CSV cuando alguno de ellos cambia
+# la limpieza incluye: nombres de columnas en minúsculas en 'hypotheses_us', renombrar 'transactionId' y
+# 'visitorId' en 'orders_us' y eliminar a los usuarios que están en ambos grupos (common_visitors)
 
-hypotheses_us = pd.read_csv('files/datasets/hypotheses_us.csv', sep= ';')
-orders_us = pd.read_csv('files/datasets/orders_us.csv', parse_dates= ['date'])
-visits_us = pd.read_csv('files/datasets/visits_us.csv', parse_dates= ['date'])
+hypotheses_us, orders_us, visits_us, common_visitors = load_cleaned('files/datasets')
 
 # %%
 # se muestra la información de cada DataFrame
@@ -84,23 +100,6 @@ orders_us.info()
 # %%
 visits_us.info()
 
-# %%
-# se cambian a minúsculas los nombres de las columnas del DataFrame 'hypotheses_us'
-# se crea una lista vacia para almcenar los nombres modificados
-column_names = []
-# se itera sobre cada nombre de columna con un bucle for
-for name in hypotheses_us.columns:
-    names_lower = name.lower()
-    column_names.append(names_lower)
-
-# %%
-# se asignan los nuevos nombres de columna
-hypotheses_us.columns = column_names
-
-# %%
-# se modifica el nombre las columnas 'transactionId' y 'visitorId' del DataFrame orders_us
-orders_us = orders_us.rename(columns= {'transactionId':'transaction_id', 'visitorId': 'visitor_id'})
-
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
 # 
@@ -138,22 +137,25 @@ orders_us = orders_us.rename(columns= {'transactionId':'transaction_id', 'visito
 hypotheses_us
 
 # %%
+# se calculan en una sola pasada los puntajes ICE y RICE de todas las hipótesis
+prioritizer = Prioritizer(hypotheses_us)
+
 # se crea una columna para almacenar el valor de ICE
-hypotheses_us['ICE'] = (hypotheses_us['impact'] * hypotheses_us['confidence']) / hypotheses_us['effort']
+hypotheses_us['ICE'] = prioritizer.scores['ICE']
 
 # %%
 # se ordenan en orden descendente de prioridad.
 hypotheses_us[['hypothesis', 'ICE']].sort_values(by= 'ICE', ascending= False)
 
 # %%
+# se toman las tres hipótesis con mayor puntaje sin ordenar toda la tabla
 print('Tres hipótesis más prometedoras con ICE:')
-print(hypotheses_us.iloc[8][0])
-print(hypotheses_us.iloc[0][0])
-print(hypotheses_us.iloc[7][0])
+for hypothesis in prioritizer.top_k(3, by='ICE')['hypothesis']:
+    print(hypothesis)
 
 # %%
 # se crea una columna para almacenar el valor de RICE
-hypotheses_us['RICE'] = (hypotheses_us['reach'] * hypotheses_us['impact'] * hypotheses_us['confidence']) / hypotheses_us['effort']
+hypotheses_us['RICE'] = prioritizer.scores['RICE']
 
 # %%
 # se ordenan en orden descendente de prioridad.
@@ -161,9 +163,14 @@ hypotheses_us[['hypothesis', 'RICE']].sort_values(by= 'RICE', ascending= False)
 
 # %%
 print('Tres hipótesis más prometedoras con RICE:')
-print(hypotheses_us.iloc[7][0])
-print(hypotheses_us.iloc[2][0])
-print(hypotheses_us.iloc[0][0])
+for hypothesis in prioritizer.top_k(3, by='RICE')['hypothesis']:
+    print(hypothesis)
+
+# %%
+# los puntajes son estimaciones en una escala del 1 al 10, por eso se simula cada puntaje como una
+# distribución alrededor del valor estimado y se calcula la probabilidad de que cada hipótesis
+# esté entre las tres más prometedoras con RICE
+top_k_probability(hypotheses_us, k=3, by='RICE', n_sims=100_000, spread=1.0, seed=42, workers=1)
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
@@ -185,58 +192,36 @@ print(hypotheses_us.iloc[0][0])
 # ###  Ingresos Acumulados por Grupo <a id='acumulado_ingreso'></a>
 
 # %%
-# para verificar si existen usuarios que estén tanto en el grupo A como en el grupo B se emplea set()
-# después se encuentra la instersección de ambos conjuntos con intersection()
-
-# se obtienen conjuntos únicos de visitor_id para cada grupo
-visitors_group_A = set(orders_us[orders_us['group'] == 'A']['visitor_id'])
-visitors_group_B = set(orders_us[orders_us['group'] == 'B']['visitor_id'])
+# para verificar si existen usuarios que estén tanto en el grupo A como en el grupo B, load_cleaned
+# cuenta los grupos distintos de cada visitor_id y guarda los que tienen más de uno (common_visitors)
+# y filtra el DataFrame 'orders_us' en donde no se tengan estos usuarios
 
-# Encuentra la intersección de los conjuntos (usuarios presentes en ambos grupos)
-common_visitors = visitors_group_A.intersection(visitors_group_B)
-
-# Se muestra la cantidad y los visitor_id que están en ambos grupos
-if not common_visitors:
+# Se muestra la cantidad y los primeros visitor_id que están en ambos grupos
+if not len(common_visitors):
     print("No hay usuarios que estén en ambos grupos A y B.")
 else:
     print(f"{len(common_visitors)} usuarios encontrados en ambos grupos:")
-    print(common_visitors)
+    print(common_visitors[:10])
 
 # %%
-# ahora se filtra el DataFrame 'orders_us' en donde no se tengan estos usuarios
-orders_us = orders_us[~orders_us['visitor_id'].isin(list(common_visitors))]
-orders_us.head()
+# antes de los cálculos acumulados y las pruebas se valida la consistencia entre 'orders_us' y 'visits_us':
+# desbalance de visitas entre grupos (prueba chi-cuadrado de SRM), días sin visitas en algún grupo,
+# pedidos fuera del rango de fechas de las visitas, más compradores que visitas en un día y
+# transaction_id duplicados; si alguna revisión falla, validate() detiene el análisis con DataQualityError
+qualityReport = validate(orders_us, visits_us)
+print(qualityReport)
 
 # %%
-# se crea una matriz con valores únicos de parejas fecha-grupo con el método drop_duplicates()
-datesGroups = orders_us[['date', 'group']].drop_duplicates()
-datesGroups.head()
+orders_us.head()
 
 # %%
-# se declara la variable ordersAggregated para almacenar: 
-# la fecha
-# el grupo del test A/B
+# se declara la variable cumulativeData para almacenar por fecha y grupo del test A/B:
 # el número de pedidos distintos para el grupo de prueba hasta la fecha especificada incluida
 # el número de usuarios distintos en el grupo de prueba que realizan al menos un pedido hasta la fecha especificada incluida
 # ingresos totales de pedidos en el grupo de prueba hasta la fecha especificada incluida
-ordersAggregated = datesGroups.apply(lambda x: orders_us[np.logical_and(orders_us['date'] <= x['date'], orders_us['group'] == x['group'])].agg({'date' : 'max', 'group' : 'max', 'transaction_id' : pd.Series.nunique, 'visitor_id' : pd.Series.nunique, 'revenue' : 'sum'}), axis=1).sort_values(by=['date','group'])
-ordersAggregated.head()
-
-# %%
-# se hace algo parecido para obtener los datos diarios acumulados agregados sobre los visitantes
-# s declara la variable visitorsAggregated para almacenar:
-# la fecha
-# el grupo del test A/B
-# el número de pedidos distintos para el grupo de prueba hasta la fecha especificada incluida
-visitorsAggregated = datesGroups.apply(lambda x: visits_us[np.logical_and(visits_us['date'] <= x['date'], visits_us['group'] == x['group'])].agg({'date' : 'max', 'group' : 'max', 'visits' : 'sum'}), axis=1).sort_values(by=['date','group'])
-visitorsAggregated.head()
-
-# %%
-# se fusionan los dos DataFrames 'ordersAggregated' y 'visitorsAggregated' en uno por las columnas 'date' y 'group'
-cumulativeData = ordersAggregated.merge(visitorsAggregated, left_on=['date', 'group'], right_on=['date', 'group'])
-# se dan a sus columnas nombres descriptivos
-# se asignan los nombres ['date', 'group', 'orders', 'buyers', 'revenue', 'visitors'] a las columnas en cumulativeData
-cumulativeData.columns = ['date', 'group', 'orders', 'buyers', 'revenue', 'visitors']
+# el número de visitas del grupo de prueba hasta la fecha especificada incluida
+# los totales se calculan en una sola pasada: se ordenan los pedidos una vez y se acumulan los totales diarios
+cumulativeData = cumulative_metrics(orders_us, visits_us)
 cumulativeData.head()
 
 # %% [markdown]
@@ -500,6 +485,12 @@ plt.axhline(y=0, color='black', linestyle='--')
 
 plt.show()
 
+# %%
+# además de observar el gráfico, se aplica una prueba secuencial (mSPRT) sobre la conversión acumulada
+# el valor p es válido aunque se revise todos los días, e indica si ya se puede parar la prueba
+sequentialConversions = sequential_test(cumulativeData, control='A', treatment='B')
+sequentialConversions.tail()
+
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
 # 
@@ -531,12 +522,12 @@ plt.show()
 # #### Gráfico de dispersión del número de pedidos por usuario <a id='scatter_orders'></a>
 
 # %%
-#* se encuentra el número de pedidos por usuario, para hacerlo, se crea un DataFrame con dos columnas:'visitor_id' y 'transaction_id'. 
-# el resultado se guarda n ordersByUsers. Ordena los datos por el número de pedidos en orden 
-ordersByUsers = (orders_us.drop(['group', 'revenue', 'date'], axis=1).groupby('visitor_id', as_index=False).agg({'transaction_id': pd.Series.nunique}))
+#* se encuentra el número de pedidos por usuario. userOrders es una tabla calculada una sola vez con
+# pedidos distintos, ingresos y primera/última fecha por usuario y grupo; se reutiliza en el resto del análisis
+userOrders = UserOrders.from_orders(orders_us)
 
-# se renombran las columnas
-ordersByUsers.columns = ['user_id', 'orders']
+# el resultado se guarda en ordersByUsers, con las columnas ['user_id', 'orders']
+ordersByUsers = userOrders.orders_by_users()
 
 # se imprimen 10 filas ordenadas de mayor a menor con base en el número de órdenes
 ordersByUsers.sort_values(by='orders', ascending= False).head(10)
@@ -544,13 +535,18 @@ ordersByUsers.sort_values(by='orders', ascending= False).head(10)
 # %%
 # se traza  un gráfico de dispersión con el número de pedidos por usuario
 # se asignan los valores del eje x
-
-# se ajustan los valores de ancho y alto del gráfico
-plt.figure(figsize=(8, 6))
 x_values = pd.Series(range(0, len(ordersByUsers)))
 
-plt.scatter(x_values, ordersByUsers['orders'])
+# con millones de usuarios se dibujan los valores extremos y una muestra estratificada del resto,
+# junto con los percentiles 95 y 99 (calculados con un sketch de cuantiles, ver más abajo)
+ordersSketch = QuantileSketch(seed=42).update(ordersByUsers['orders'])
+ordersChart = scatter_chart('pedidos_por_usuario', 'Número de pedidos por usuario', 'Usuario', 'Pedidos',
+                            [('', x_values, ordersByUsers['orders'])],
+                            percentiles=dict(zip([95, 99], ordersSketch.percentile([95, 99]))), seed=42)
 
+# se ajustan los valores de ancho y alto del gráfico
+fig, ax = plt.subplots(figsize=(8, 6))
+draw(ordersChart, ax)
 plt.show()
 
 # %% [markdown]
@@ -566,8 +562,11 @@ plt.show()
 # </div>
 
 # %%
-# con numpy se calculan los percentiles 95 y 99
-print(np.percentile(ordersByUsers['orders'], [95, 99]))
+# se calculan los percentiles 95 y 99 con un sketch de cuantiles (KLL), que se puede alimentar
+# por bloques y combinar entre grupos o días; no interpola entre valores (método 'inverted_cdf' de
+# np.percentile): con menos de k=200 valores coincide con ese método y en otro caso el error de rango
+# es de alrededor de 1.3 %
+print(ordersSketch.percentile([95, 99]))
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
@@ -589,14 +588,20 @@ print(np.percentile(ordersByUsers['orders'], [95, 99]))
 # se guardan los valores para el eje horizontal x_values_revenue: los números generados de observaciones.
 x_values_revenue = pd.Series(range(0, len(orders_us['revenue'])))
 
-# se toman los valores del eje vertical de la columna 'revenue' del DataFrame 'orders_us'
-plt.figure(figsize=(8, 6))
-plt.scatter(x_values_revenue, orders_us['revenue'])
+# se toman los valores del eje vertical de la columna 'revenue' del DataFrame 'orders_us';
+# como en el gráfico anterior, se dibujan los extremos, una muestra estratificada y los percentiles 95 y 99
+revenueSketch = QuantileSketch(seed=42).update(orders_us['revenue'])
+revenueChart = scatter_chart('precios_pedidos', 'Precios de los pedidos', 'Pedido', 'Ingresos',
+                             [('', x_values_revenue, orders_us['revenue'])],
+                             percentiles=dict(zip([95, 99], revenueSketch.percentile([95, 99]))), seed=42)
+
+fig, ax = plt.subplots(figsize=(8, 6))
+draw(revenueChart, ax)
 plt.show()
 
 # %%
-# con numpy se calculan los percentiles 95 y 99
-print(np.percentile(orders_us['revenue'], [95, 99]))
+# se calculan los percentiles 95 y 99 de los ingresos con el sketch de cuantiles
+print(revenueSketch.percentile([95, 99]))
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
@@ -627,12 +632,10 @@ print(np.percentile(orders_us['revenue'], [95, 99]))
 
 # %%
 # se almacenan los valores para el grupo A
-ordersByUsersA = orders_us[orders_us['group']=='A'].groupby('visitor_id', as_index=False).agg({'transaction_id' : pd.Series.nunique})
-ordersByUsersA.columns = ['user_id', 'orders']
+ordersByUsersA = userOrders.orders_by_users('A')
 
 # se almacenan los valores para el grupo B
-ordersByUsersB = orders_us[orders_us['group']=='B'].groupby('visitor_id', as_index=False).agg({'transaction_id' : pd.Series.nunique})
-ordersByUsersB.columns = ['user_id', 'orders']
+ordersByUsersB = userOrders.orders_by_users('B')
 
 print('Grupo A')
 print(ordersByUsersA.head())
@@ -641,29 +644,27 @@ print('Grupo B')
 print(ordersByUsersB.head())
 
 # %%
-# se declara las variables sampleA y sampleB, con los usuarios que realizaron pedidos y los números de 
-# pedidos correspondientes. Los usuarios sin pedidos tendrán un 0
-# Lo anterior es necesario para preparar las muestras para la prueba de Mann-Whitney
-
-sampleA = pd.concat([ordersByUsersA['orders'], 
-                     pd.Series(0, index=np.arange(visits_us[visits_us['group']=='A']['visits'].sum() 
-                     - len(ordersByUsersA['orders'])), name='orders')], axis=0
-                    )
-
-sampleB = pd.concat([ordersByUsersB['orders'],
-                     pd.Series(0, index=np.arange(visits_us[visits_us['group']=='B']['visits'].sum() 
-                     - len(ordersByUsersB['orders'])), name='orders')],axis=0
-                   )
+# se particionan los pedidos y las visitas por grupo una sola vez con VariantAnalysis
+# para cada grupo se preparan las muestras del número de pedidos por usuario, los usuarios sin pedidos
+# tendrán un 0, y las muestras de ingresos por pedido
+# compare() aplica la prueba de Mann-Whitney a cada grupo contra el grupo de control A
+variants = VariantAnalysis(orders_us, visits_us, control='A', users=userOrders)
+results = variants.compare().iloc[0]
 
 # %%
 # Se calcula la significancia estadística de la diferencia en la conversión basada en los resultados después 
-# Se aplica la prueba de Mann-Whitney
 # Se imprime el valor p para comparar la conversión de los grupos 
 # se redondea a cinco decimales.
-print(f'Valor p: {stats.mannwhitneyu(sampleA, sampleB)[1] :.5f}')
+print(f"Valor p: {results['conversion_p_value'] :.5f}")
 
 # se calcula e imprime la diferencia relativa en la conversión entre los grupos
-print(f'Diferencia relativa en la conversión para el grupo B: {sampleB.mean()/sampleA.mean()-1 :.5f}')
+print(f"Diferencia relativa en la conversión para el grupo B: {results['conversion_lift'] :.5f}")
+
+# %%
+# intervalo de confianza bootstrap del 95 % para la diferencia relativa en la conversión
+# los remuestreos se hacen sobre los histogramas, incluidas las visitas sin pedido
+conversion_ci = lift_interval(variants.conversion_sample('A'), variants.conversion_sample('B'), seed=42, workers=1)
+print(f'Intervalo de confianza del 95 %: [{conversion_ci.low :.5f}, {conversion_ci.high :.5f}]')
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
@@ -682,13 +683,23 @@ print(f'Diferencia relativa en la conversión para el grupo B: {sampleB.mean()/s
 
 # %%
 # ahora para calcular la importancia estadística de la diferencia en el tamaño medio de los pedidos de los grupos, 
-# pasaremos los datos sobre los ingresos al criterio mannwhitneyu()
-p_value = stats.mannwhitneyu(orders_us[orders_us['group']=='A']['revenue'], orders_us[orders_us['group']=='B']['revenue']).pvalue
+# se usan los datos sobre los ingresos que compare() pasó al criterio mannwhitneyu()
+print(f"Valor p: {round(results['revenue_p_value'], 5)}")
 
-print(f'Valor p: {round(p_value, 5)}')
+# se imprime la diferencia relativa en el tamaño de los pedidos entre los grupos
+print(f"Diferencia relativa en el tamaño promedio para el grupo B: {results['revenue_lift'] :3f}")
 
-# se calcula e imprime la diferencia relativa en el tamaño de los pedidos entre los grupos
-print(f"Diferencia relativa en el tamaño promedio para el grupo B: {orders_us[orders_us['group']=='B']['revenue'].mean()/orders_us[orders_us['group']=='A']['revenue'].mean()-1 :3f}")
+# %%
+# intervalo de confianza bootstrap del 95 % para la diferencia relativa en el tamaño promedio de pedido
+revenue_ci = lift_interval(variants.revenue_sample('A'), variants.revenue_sample('B'), seed=42, workers=1)
+print(f'Intervalo de confianza del 95 %: [{revenue_ci.low :.5f}, {revenue_ci.high :.5f}]')
+
+# %%
+# evolución de ambas pruebas: para cada día se repiten con los pedidos hasta esa fecha (el mismo prefijo
+# que cumulativeData); los conteos se actualizan día a día en lugar de repetir las pruebas completas
+# con window=7 se usarían sólo los últimos 7 días
+significanceSeries = significance_series(variants)
+significanceSeries.tail()
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
@@ -715,21 +726,22 @@ print(f"Diferencia relativa en el tamaño promedio para el grupo B: {orders_us[o
 # Recodando que los percentiles 95 y 99 para el tamaño promedio de pedido fueron 414 y 830.  
 # Para el número de pedidos, los percentiles 95 y 99 fueron de 1 y 2 pedidos.  
 #     
-# Consideraremos usuarios anómalos a aquellos que realizaron más de 1 pedido o realizaron uno de más de 415. Así, se elimina el 5 % de los usuarios con más pedidos y entre el 1% y el 5% de los pedidos más caros.
+# Consideraremos usuarios anómalos a aquellos que realizaron más pedidos que el percentil 95 (1 pedido) o realizaron uno de más que el percentil 95 de los ingresos (alrededor de 415); ambos límites se leen de los sketches de cuantiles. Así, se elimina el 5 % de los usuarios con más pedidos y entre el 1% y el 5% de los pedidos más caros.
 #     
 # </span>
 #     
 # </div>
 
 # %%
-# se crean slices de datos con los usuarios que realizaron más de dos pedidos (usersWithManyOrders)
-usersWithManyOrders = pd.concat([ordersByUsersA[ordersByUsersA['orders'] > 1]['user_id'], ordersByUsersB[ordersByUsersB['orders'] > 1]['user_id']], axis = 0)
+# los límites se leen del percentil 95 de los sketches de cuantiles en lugar de escribirlos a mano
+# AnomalyFilter usa el número de pedidos y el pedido más caro de cada usuario de la tabla userOrders
+# un usuario es anómalo si realizó más pedidos que el límite (order_count_percentile)
+# o algún pedido por más del límite de ingresos (revenue_percentile)
+anomalies = AnomalyFilter(userOrders, [order_count_percentile(95, ordersSketch), revenue_percentile(95, revenueSketch)])
+print(anomalies.rules)
 
-# y se filtran los usuarios que realizaron pedidos por más de $500 (usersWithExpensiveOrders)
-usersWithExpensiveOrders = orders_us[orders_us['revenue'] > 415]['visitor_id']
-
-# se unen los 'usersWithManyOrders' y 'usersWithExpensiveOrders' en una tabla llamada abnormalUsers
-abnormalUsers = pd.concat([usersWithManyOrders, usersWithExpensiveOrders], axis= 0).drop_duplicates().sort_values()
+# los usuarios anómalos quedan en una tabla llamada abnormalUsers
+abnormalUsers = anomalies.abnormal_users
 
 print(abnormalUsers.head())
 print()
@@ -750,16 +762,14 @@ print(f'Usuarios anómalos: {abnormalUsers.shape[0]}')
 # </div>
 
 # %%
-# se crean las variables sampleAFiltered y sampleBFiltered para almacenar los datos después de que se hayan eliminado las anomalías.
-sampleAFiltered = pd.concat([ordersByUsersA[np.logical_not(ordersByUsersA['user_id'].isin(abnormalUsers))]['orders'], pd.Series(0, index=np.arange(visits_us[visits_us['group']=='A']['visits'].sum() - len(ordersByUsersA['orders'])),name='orders')],axis=0)
-
-sampleBFiltered = pd.concat([ordersByUsersB[np.logical_not(ordersByUsersB['user_id'].isin(abnormalUsers))]['orders'], pd.Series(0, index=np.arange(visits_us[visits_us['group']=='B']['visits'].sum() - len(ordersByUsersB['orders'])),name='orders')],axis=0)
+# se usa la máscara de pedidos de usuarios anómalos ya calculada y se repiten las pruebas sin ellos
+abnormalOrders = anomalies.order_mask
+resultsFiltered = variants.compare(exclude=abnormalOrders).iloc[0]
 
-# se aplica el criterio estadístico de Mann-Whitney a las muestras resultantes
-p_value_filtered = stats.mannwhitneyu(sampleAFiltered, sampleBFiltered).pvalue
-print(f'Valor p: {round(p_value_filtered, 5)}')
+# se imprime el resultado del criterio estadístico de Mann-Whitney para las muestras filtradas
+print(f"Valor p: {round(resultsFiltered['conversion_p_value'], 5)}")
 print()
-print(f'Diferencia relativa en la conversión para el grupo B: {sampleBFiltered.mean()/sampleAFiltered.mean()-1 :.5f}')
+print(f"Diferencia relativa en la conversión para el grupo B: {resultsFiltered['conversion_lift'] :.5f}")
 
 
 
@@ -780,21 +790,37 @@ print(f'Diferencia relativa en la conversión para el grupo B: {sampleBFiltered.
 # 
 
 # %%
-# # se aplica el criterio estadístico de Mann-Whitney 
-p_value_filtered_orders = stats.mannwhitneyu(orders_us[np.logical_and(orders_us['group']=='A',
-                                    np.logical_not(orders_us['visitor_id'].isin(abnormalUsers)))]['revenue'],
-                                    orders_us[np.logical_and(orders_us['group']=='B',
-                                    np.logical_not(orders_us['visitor_id'].isin(abnormalUsers)))]['revenue']).pvalue
-
+# # se aplica el criterio estadístico de Mann-Whitney (calculado en resultsFiltered)
+print(f"Valor p: {round(resultsFiltered['revenue_p_value'], 5)}")
+print()
 # Diferencia relativa del tamaño de los pedidos
-groupA = orders_us[np.logical_and(orders_us['group']=='A', np.logical_not(orders_us['visitor_id'].isin(abnormalUsers)))]['revenue'].mean()
-groupB = orders_us[np.logical_and(orders_us['group']=='B',np.logical_not(orders_us['visitor_id'].isin(abnormalUsers)))]['revenue'].mean()
+print(f"Diferencia relativa en el tamaño promedio para el grupo B: {resultsFiltered['revenue_lift'] :.5f}")
+
+# %%
+# para ver qué tanto dependen los resultados filtrados de los límites elegidos, se repiten las pruebas
+# con otras combinaciones de límite de pedidos y límite de ingresos
+sensitivity = threshold_sweep(variants, [(orders_cap, revenue_cap) for orders_cap in [1, 2, 3]
+                                         for revenue_cap in revenueSketch.percentile([90, 95, 97.5, 99])], workers=1)
+sensitivity
 
-dif_orders_filt = groupB / groupA - 1
+# %%
+# alternativa al filtrado: ajuste CUPED con los pedidos de cada visitante antes del test, si existe el
+# archivo opcional files/datasets/pre_orders_us.csv (mismo esquema que orders_us.csv); reduce la varianza
+# de la prueba del tamaño de pedido sin descartar a los usuarios anómalos
+preOrders = load_pre_period('files/datasets')
+if preOrders is None:
+    print('No hay datos del periodo previo (pre_orders_us.csv), se omite el ajuste CUPED')
+else:
+    print(cuped_compare(variants, preOrders))
+    print('La conversión no se ajusta: las visitas sin pedido no tienen visitorId y no hay una covariable '
+          'previa para cada visita')
 
-print(f'Valor p: {round(p_value_filtered_orders, 5)}')
-print()
-print(f'Diferencia relativa en el tamaño promedio para el grupo B: {dif_orders_filt :.5f}')
+# %%
+# resultados por segmento: día de la semana y, si existen en los datos, dispositivo, región y canal
+# cada valor de segmento se compara contra el grupo A; los valores p se corrigen con Holm porque se
+# hacen muchas pruebas a la vez y alguna saldría significativa por azar
+segmentResults = segment_tests(orders_us, visits_us, control='A', seed=42, workers=1)
+segmentResults
 
 # %% [markdown]
 # <div style="background-color: lightyellow; padding: 10px;">
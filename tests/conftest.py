@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def orders_visits():
+    """Pedidos y visitas de un test chico: dos grupos, dos días, un usuario con un pedido caro."""
+    orders = pd.DataFrame({
+        'transaction_id': [1, 2, 3, 4, 5, 6],
+        'visitor_id': [10, 10, 11, 20, 21, 21],
+        'date': pd.to_datetime(['2019-08-01', '2019-08-02', '2019-08-01', '2019-08-01', '2019-08-02', '2019-08-02']),
+        'revenue': [100.0, 250.0, 80.0, 120.0, 90.0, 3000.0],
+        'group': pd.Categorical(['A', 'A', 'A', 'B', 'B', 'B']),
+    })
+    visits = pd.DataFrame({
+        'date': pd.to_datetime(['2019-08-01', '2019-08-02'] * 2),
+        'group': pd.Categorical(['A', 'A', 'B', 'B']),
+        'visits': [20, 20, 20, 20],
+    })
+    return orders, visits
@@ -0,0 +1,16 @@
+import numpy as np
+
+from abtest.bootstrap import lift_interval
+
+
+def test_small_samples_get_finite_intervals():
+    # con 5 pedidos por grupo casi todos los bloques tienen algún remuestreo con pesos en 0
+    interval = lift_interval([10.0, 20.0, 30.0, 40.0, 50.0], [15.0, 25.0, 35.0, 45.0, 55.0],
+                             n_boot=2_000, seed=1, workers=1)
+    assert np.isfinite([interval.low, interval.high]).all()
+    assert interval.low <= interval.lift <= interval.high
+
+
+def test_single_value_samples():
+    interval = lift_interval([10.0], [12.0], n_boot=500, seed=1, workers=1)
+    assert np.allclose([interval.low, interval.high], 0.2)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from abtest.cumulative import cumulative_metrics
+
+
+def _notebook_cumulative(orders_us, visits_us):
+    """`cumulativeData` como lo calculaba el notebook: un filtro por cada pareja fecha-grupo de `datesGroups`."""
+    datesGroups = orders_us[['date', 'group']].drop_duplicates()
+    ordersAggregated = datesGroups.apply(
+        lambda x: orders_us[np.logical_and(orders_us['date'] <= x['date'], orders_us['group'] == x['group'])].agg(
+            {'date': 'max', 'group': 'max', 'transaction_id': pd.Series.nunique, 'visitor_id': pd.Series.nunique,
+             'revenue': 'sum'}), axis=1).sort_values(by=['date', 'group'])
+    visitorsAggregated = datesGroups.apply(
+        lambda x: visits_us[np.logical_and(visits_us['date'] <= x['date'], visits_us['group'] == x['group'])].agg(
+            {'date': 'max', 'group': 'max', 'visits': 'sum'}), axis=1).sort_values(by=['date', 'group'])
+    cumulativeData = ordersAggregated.merge(visitorsAggregated, left_on=['date', 'group'], right_on=['date', 'group'])
+    cumulativeData.columns = ['date', 'group', 'orders', 'buyers', 'revenue', 'visitors']
+    return cumulativeData
+
+
+def test_matches_notebook_dates_groups(orders_visits):
+    orders, visits = orders_visits
+    # filas desordenadas, un usuario que vuelve a comprar otro día y un día con visitas pero sin pedidos
+    extra = pd.DataFrame({'transaction_id': [7, 8], 'visitor_id': [20, 12],
+                          'date': pd.to_datetime(['2019-08-04', '2019-08-04']), 'revenue': [40.0, 15.5],
+                          'group': ['B', 'A']})
+    orders = pd.concat([orders.assign(group=orders['group'].astype(str)), extra], ignore_index=True)
+    orders = orders.sample(frac=1, random_state=0).reset_index(drop=True)
+    visits = pd.concat([visits.assign(group=visits['group'].astype(str)),
+                        pd.DataFrame({'date': pd.to_datetime(['2019-08-03'] * 2 + ['2019-08-04'] * 2),
+                                      'group': ['A', 'B', 'A', 'B'], 'visits': [15, 17, 30, 25]})],
+                       ignore_index=True)
+
+    expected = _notebook_cumulative(orders, visits).astype(
+        {'orders': 'int64', 'buyers': 'int64', 'revenue': 'float64', 'visitors': 'int64'})
+    pd.testing.assert_frame_equal(cumulative_metrics(orders, visits), expected)
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from abtest.cache import load_cleaned
+from abtest.cumulative import cumulative_from_daily, cumulative_metrics
+from abtest.loading import load_aggregates, read_orders_chunks
+from abtest.users import UserOrders
+
+
+def _write_datasets(directory, orders, visits):
+    orders = orders.rename(columns={'transaction_id': 'transactionId', 'visitor_id': 'visitorId'})
+    orders.to_csv(directory / 'orders_us.csv', index=False)
+    visits.to_csv(directory / 'visits_us.csv', index=False)
+    pd.DataFrame({'Hypothesis': ['h0'], 'Reach': [1], 'Impact': [1], 'Confidence': [1], 'Efforts': [1]}).to_csv(
+        directory / 'hypotheses_us.csv', sep=';', index=False)
+
+
+def _contaminated(orders_visits):
+    orders, visits = orders_visits
+    # el visitante 10 también compra en el grupo B, así que ambos caminos lo quitan
+    extra = pd.DataFrame({'transaction_id': [7], 'visitor_id': [10], 'date': pd.to_datetime(['2019-08-02']),
+                          'revenue': [55.5], 'group': pd.Categorical(['B'], categories=['A', 'B'])})
+    return pd.concat([orders, extra], ignore_index=True), visits
+
+
+def test_streamed_cumulative_matches_in_memory(tmp_path, orders_visits):
+    _write_datasets(tmp_path, *_contaminated(orders_visits))
+    cleaned = load_cleaned(str(tmp_path))
+    aggregates = load_aggregates(str(tmp_path / 'orders_us.csv'), str(tmp_path / 'visits_us.csv'), chunksize=2)
+
+    assert aggregates.contaminated.tolist() == [10]
+    pd.testing.assert_frame_equal(cumulative_from_daily(aggregates.daily_orders, aggregates.daily_visits),
+                                  cumulative_metrics(cleaned.orders_us, cleaned.visits_us))
+    pd.testing.assert_frame_equal(UserOrders.from_frame(aggregates.users).table,
+                                  UserOrders.from_orders(cleaned.orders_us).table)
+
+
+def test_revenue_cents_keep_refunds_and_large_amounts(tmp_path, orders_visits):
+    orders, visits = orders_visits
+    orders = orders.assign(revenue=[-5.0, 5e7, 80.0, 120.0, 90.0, 3000.0])
+    _write_datasets(tmp_path, orders, visits)
+    chunk = next(read_orders_chunks(str(tmp_path / 'orders_us.csv')))
+    assert chunk['revenue_cents'].tolist()[:2] == [-500, 5_000_000_000]
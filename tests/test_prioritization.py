@@ -0,0 +1,31 @@
+import pandas as pd
+
+from abtest.prioritization import Prioritizer
+
+
+def _hypotheses():
+    return pd.DataFrame({
+        'hypothesis': ['h0', 'h1', 'h2'],
+        'reach': [1, 5, 3],
+        'impact': [2, 2, 4],
+        'confidence': [3, 3, 3],
+        'effort': [1, 2, 6],
+    })
+
+
+def test_update_is_reflected_in_frame_and_top_k():
+    prioritizer = Prioritizer(_hypotheses())
+    prioritizer.update(0, reach=9)
+
+    frame = prioritizer.frame()
+    assert frame.loc[0, 'reach'] == 9
+    assert frame.loc[0, 'RICE'] == 9 * 2 * 3 / 1
+    top = prioritizer.top_k(1, by='RICE')
+    assert top.iloc[0]['hypothesis'] == 'h0'
+    assert top.iloc[0]['reach'] == 9
+
+
+def test_frame_keeps_original_columns_without_updates():
+    hypotheses = _hypotheses()
+    frame = Prioritizer(hypotheses).frame()
+    pd.testing.assert_frame_equal(frame[hypotheses.columns], hypotheses)
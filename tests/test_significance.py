@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from abtest.ranks import RankIndex
+from abtest.significance import mannwhitneyu_hist
+
+
+def _samples():
+    rng = np.random.default_rng(3)
+    return {
+        # pedidos por visita: casi todo 0, con empates en 0 y en cada número de pedidos
+        'orders_with_zeros': (np.concatenate([np.zeros(400, int), rng.integers(1, 4, 25)]),
+                              np.concatenate([np.zeros(380, int), rng.integers(1, 5, 30)])),
+        'tied_floats': (rng.choice([0.0, 9.9, 49.5, 120.25, 300.0], 60),
+                        rng.choice([0.0, 9.9, 49.5, 99.0, 120.25], 45)),
+        'few_with_ties': (np.array([0.0, 0.0, 1.5, 3.0]), np.array([0.0, 1.5, 1.5, 2.0, 7.0])),
+        'continuous': (rng.lognormal(5, 1, 200).round(2), rng.lognormal(5.1, 1, 150).round(2)),
+        'small_without_ties': (np.array([1.0, 4.0, 6.0]), np.array([2.0, 3.0, 5.0, 8.0, 9.0])),
+    }
+
+
+SAMPLES = _samples()
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+@pytest.mark.parametrize('alternative', ['two-sided', 'less', 'greater'])
+@pytest.mark.parametrize('use_continuity', [True, False])
+def test_hist_matches_scipy(name, alternative, use_continuity):
+    x, y = SAMPLES[name]
+    expected = stats.mannwhitneyu(x, y, use_continuity=use_continuity, alternative=alternative)
+    result = mannwhitneyu_hist(*np.unique(x, return_counts=True), *np.unique(y, return_counts=True),
+                               use_continuity=use_continuity, alternative=alternative)
+    assert result.statistic == pytest.approx(expected.statistic, rel=1e-12)
+    assert result.pvalue == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-15)
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_rank_index_matches_scipy(name):
+    x, y = SAMPLES[name]
+    # un tercer grupo que no participa en la prueba, como una variante C
+    values = np.concatenate([x, y, [0.0, 5.0]])
+    groups = np.repeat([0, 1, 2], [x.size, y.size, 2])
+    index = RankIndex(values, groups)
+
+    expected = stats.mannwhitneyu(x, y)
+    result = index.test(0, 1)
+    assert result.statistic == pytest.approx(expected.statistic, rel=1e-12)
+    assert result.pvalue == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-15)
+
+    mask = np.ones(values.size, dtype=bool)
+    mask[::3] = False
+    expected = stats.mannwhitneyu(x[mask[:x.size]], y[mask[x.size:x.size + y.size]])
+    result = index.test(0, 1, mask)
+    assert result.statistic == pytest.approx(expected.statistic, rel=1e-12)
+    assert result.pvalue == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-15)
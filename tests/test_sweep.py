@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from abtest.sweep import threshold_sweep
+from abtest.users import UserOrders
+from abtest.variants import VariantAnalysis
+
+
+def test_sweep_matches_across_workers(orders_visits):
+    variants = VariantAnalysis(*orders_visits, control='A')
+    grid = [(order_cap, revenue_cap) for order_cap in [1, 2] for revenue_cap in [200.0, 5000.0]]
+    serial = threshold_sweep(variants, grid, workers=1)
+    assert serial['abnormal_users'].tolist() == [2, 2, 2, 0]
+    pd.testing.assert_frame_equal(serial, threshold_sweep(variants, grid, workers=2))
+
+
+def test_sweep_needs_users_built_from_orders(orders_visits):
+    orders, visits = orders_visits
+    users = UserOrders.from_frame(UserOrders.from_orders(orders).table)
+    variants = VariantAnalysis(orders, visits, control='A', users=users)
+    with pytest.raises(ValueError, match='UserOrders.from_orders'):
+        threshold_sweep(variants, [(1, 200.0)], workers=1)
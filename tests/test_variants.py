@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from abtest.cuped import cuped_compare
+from abtest.timeseries import significance_series
+from abtest.users import UserOrders
+from abtest.variants import VariantAnalysis
+
+
+def _from_frame(orders, visits):
+    users = UserOrders.from_frame(UserOrders.from_orders(orders).table)
+    return VariantAnalysis(orders, visits, control='A', users=users)
+
+
+def test_last_series_row_matches_compare(orders_visits):
+    variants = VariantAnalysis(*orders_visits, control='A')
+    exclude = (orders_visits[0]['visitor_id'] == 21).to_numpy()
+    last = significance_series(variants, exclude=exclude).iloc[-1]
+    expected = variants.compare(exclude=exclude).iloc[0]
+    for column in ['conversion_p_value', 'conversion_lift', 'revenue_p_value', 'revenue_lift']:
+        assert np.isclose(last[column], expected[column])
+
+
+@pytest.mark.parametrize('analysis', [
+    lambda variants: variants.compare(exclude=np.zeros(len(variants.orders_us), dtype=bool)),
+    lambda variants: significance_series(variants),
+    lambda variants: cuped_compare(variants, pd.DataFrame({'visitor_id': [10], 'pre_orders': [1],
+                                                           'pre_revenue': [50.0]})),
+])
+def test_users_from_frame_raise_value_error(orders_visits, analysis):
+    with pytest.raises(ValueError, match='UserOrders.from_orders'):
+        analysis(_from_frame(*orders_visits))